@@ -0,0 +1,157 @@
+// assets/ledger.js
+
+// Variance of one row as the server computes it: blank amounts count as 0,
+// and rows whose amounts are not numbers get a blank Variance
+function ledgerVariance(row, sign) {
+    var amount = function(value) {
+        return value === '' || value === null || value === undefined ? 0 : Number(value);
+    };
+    var budgeted = amount(row['Budgeted Amount']);
+    var actual = amount(row['Actual Amount']);
+    if (isNaN(budgeted) || isNaN(actual)) {
+        return '';
+    }
+    return sign * (actual - budgeted);
+}
+
+// Actual Amount of a row as the server's rollups add it up: non-numbers count as 0
+function ledgerActual(row) {
+    var value = row ? row['Actual Amount'] : 0;
+    value = value === '' || value === null || value === undefined ? 0 : Number(value);
+    return isNaN(value) ? 0 : value;
+}
+
+// Edit operations turning the previous table data into the current data, so
+// only changed rows are sent to the server's ledger store. Page rows carry
+// their ledger position as 'id'; operations use it as the index, plus
+// 'position' (row on the page) for updates. Variance of edited rows is filled
+// in here, so the table updates without waiting for the server. The delta
+// also carries 'actual', the change to the table's Actual Amount total (null
+// when unknown), so the metrics update before the server's summary arrives.
+function ledgerTableDelta(timestamp, rows, previous, sign) {
+    var no_update = window.dash_clientside.no_update;
+    rows = (rows || []).slice();
+    var stored = function(row) {
+        var copy = Object.assign({}, row);
+        delete copy.id;
+        return copy;
+    };
+    var ledgerIndex = function(row, i) {
+        return row && row.id !== undefined ? row.id : i;
+    };
+    var same = function(a, b) { return JSON.stringify(a) === JSON.stringify(b); };
+    var withVariance = function(i) {
+        var variance = ledgerVariance(rows[i], sign);
+        if (rows[i]['Variance'] !== variance) {
+            rows[i] = Object.assign({}, rows[i], {'Variance': variance});
+            varianceChanged = true;
+        }
+        return stored(rows[i]);
+    };
+    var varianceChanged = false;
+    var ops = [];
+    var actual = 0;
+    var i;
+
+    if (!previous) {
+        actual = null;
+        for (i = 0; i < rows.length; i++) {
+            ops.push({op: 'update', index: ledgerIndex(rows[i], i), position: i, row: withVariance(i)});
+        }
+    } else if (rows.length < previous.length) {
+        // Deleted rows: walk both lists, skipping rows missing from the
+        // current data, then delete from the end so indices stay valid
+        var deleted = [];
+        var j = 0;
+        for (i = 0; i < previous.length; i++) {
+            if (j < rows.length && same(previous[i], rows[j])) {
+                j++;
+            } else {
+                deleted.push(ledgerIndex(previous[i], i));
+                actual -= ledgerActual(previous[i]);
+            }
+        }
+        deleted.sort(function(a, b) { return b - a; });
+        for (i = 0; i < deleted.length; i++) {
+            ops.push({op: 'delete', index: deleted[i]});
+        }
+    } else {
+        // Edited rows, then rows added past the end (e.g. by pasting),
+        // which are appended to the ledger
+        for (i = 0; i < previous.length; i++) {
+            if (!same(previous[i], rows[i])) {
+                actual += ledgerActual(rows[i]) - ledgerActual(previous[i]);
+                ops.push({op: 'update', index: ledgerIndex(previous[i], i), position: i, row: withVariance(i)});
+            }
+        }
+        for (i = previous.length; i < rows.length; i++) {
+            actual += ledgerActual(rows[i]);
+            ops.push({op: 'insert', index: null, row: withVariance(i)});
+        }
+    }
+    return [{timestamp: timestamp, ops: ops, actual: actual}, varianceChanged ? rows : no_update];
+}
+
+// Clientside callbacks for the budgeting tables. Dash loads every file in
+// assets/ automatically and exposes these as ClientsideFunction('ledger', ...).
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    ledger: {
+        incomeTableDelta: function(timestamp, rows, previous) {
+            return ledgerTableDelta(timestamp, rows, previous, 1);
+        },
+
+        expensesTableDelta: function(timestamp, rows, previous) {
+            return ledgerTableDelta(timestamp, rows, previous, -1);
+        },
+
+        // Actual income and expense totals: recomputed from the shared ledger
+        // rollups when they arrive, and moved by each edit delta before that
+        ledgerTotals: function(summary, incomeDelta, expensesDelta, totals) {
+            var triggered = (window.dash_clientside.callback_context.triggered || [])
+                .map(function(item) { return item.prop_id; });
+            var delta = triggered.indexOf('income-delta.data') !== -1 ? incomeDelta
+                : triggered.indexOf('expenses-delta.data') !== -1 ? expensesDelta : null;
+            if (delta && totals) {
+                if (delta.actual === null || delta.actual === undefined || delta.actual === 0) {
+                    return window.dash_clientside.no_update;
+                }
+                var table = delta === incomeDelta ? 'income' : 'expenses';
+                totals = Object.assign({}, totals);
+                totals[table] += delta.actual;
+                return totals;
+            }
+            if (!summary) {
+                return window.dash_clientside.no_update;
+            }
+            var sum = function(values) {
+                return values.reduce(function(total, value) { return total + value; }, 0);
+            };
+            return {income: sum(summary.income['Actual Amount']), expenses: sum(summary.expenses['Actual Amount'])};
+        },
+
+        // Totals, savings rate and expense ratio
+        financialMetrics: function(totals) {
+            if (!totals) {
+                return window.dash_clientside.no_update;
+            }
+            var totalIncome = totals.income;
+            var totalExpenses = totals.expenses;
+            var netIncome = totalIncome - totalExpenses;
+
+            // Calculate savings rate and expense ratio
+            var savingsRate = totalIncome !== 0 ? (netIncome / totalIncome) * 100 : 0;
+            var expenseRatio = totalIncome !== 0 ? (totalExpenses / totalIncome) * 100 : 0;
+
+            var paragraph = function(text) {
+                return {type: 'P', namespace: 'dash_html_components', props: {children: text}};
+            };
+            return [
+                paragraph('Total Income: $' + totalIncome.toFixed(2)),
+                paragraph('Total Expenses: $' + totalExpenses.toFixed(2)),
+                paragraph('Net Income: $' + netIncome.toFixed(2)),
+                paragraph('Savings Rate: ' + savingsRate.toFixed(2) + '%'),
+                paragraph('Expense Ratio: ' + expenseRatio.toFixed(2) + '%')
+            ];
+        }
+    }
+});
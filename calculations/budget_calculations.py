@@ -20,3 +20,18 @@ def calculate_total_variance(merged_data):
     total_actual = merged_data['Actual Amount'].sum()
     total_variance = total_budgeted - total_actual
     return total_budgeted, total_actual, total_variance
+
+# Columns summed per (month, source/category) for the budgeting dashboard
+LEDGER_AMOUNTS = ['Budgeted Amount', 'Actual Amount']
+
+def monthly_totals(rollup, names=None):
+    """
+    Budgeted and actual sums per period from a rollup, optionally for some
+    sources/categories only, indexed by period code in date order. Undated
+    rows are left out.
+    """
+    frame = pd.DataFrame({key: rollup[key] for key in ['Period', 'Name'] + LEDGER_AMOUNTS})
+    if names:
+        frame = frame[frame['Name'].isin(names)]
+    frame = frame[frame['Period'].notna()].astype({'Period': 'int64'})
+    return frame.groupby('Period')[LEDGER_AMOUNTS].sum()
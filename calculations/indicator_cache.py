@@ -0,0 +1,176 @@
+# calculations/indicator_cache.py
+
+import contextlib
+import functools
+import hashlib
+import os
+import pickle
+import sys
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from data.data_cache import evict_cache
+
+# Memory and optional disk tier limits (override with environment variables)
+INDICATOR_CACHE_MAX_BYTES = int(os.environ.get('INDICATOR_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+INDICATOR_CACHE_DIR = os.environ.get('INDICATOR_CACHE_DIR')
+INDICATOR_CACHE_DISK_MAX_BYTES = int(os.environ.get('INDICATOR_CACHE_DISK_MAX_BYTES', 512 * 1024 * 1024))
+
+def _checksum(values):
+    values = np.ascontiguousarray(values)
+    if values.dtype == object:
+        return hashlib.blake2b(pickle.dumps(values), digest_size=16).hexdigest()
+    return hashlib.blake2b(values.reshape(-1).view(np.uint8), digest_size=16).hexdigest()
+
+def fingerprint(value):
+    """
+    Cheap, content-based key for an argument: index range, length and a
+    checksum of the values for pandas and NumPy inputs, the value itself otherwise.
+    """
+    if isinstance(value, (pd.Series, pd.DataFrame)):
+        index = value.index
+        bounds = (str(index[0]), str(index[-1])) if len(index) else ()
+        labels = (value.name,) if isinstance(value, pd.Series) else tuple(value.columns)
+        index_values = index.asi8 if hasattr(index, 'asi8') else index.to_numpy()
+        return (type(value).__name__, len(index), bounds, labels, _checksum(index_values),
+                _checksum(value.to_numpy()))
+    if isinstance(value, np.ndarray):
+        return ('ndarray', value.shape, str(value.dtype), _checksum(value))
+    return value
+
+def _nbytes(value):
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True))
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    return sys.getsizeof(value)
+
+class IndicatorCache:
+    """
+    LRU cache of indicator results bounded by total byte size, with an
+    optional pickle-per-entry disk tier that survives worker restarts.
+    Cached results are shared between callers; treat them as read-only.
+    """
+    def __init__(self, max_bytes=INDICATOR_CACHE_MAX_BYTES, disk_dir=INDICATOR_CACHE_DIR,
+                 disk_max_bytes=INDICATOR_CACHE_DISK_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+
+    def _disk_path(self, key):
+        digest = hashlib.blake2b(pickle.dumps(key), digest_size=20).hexdigest()
+        return os.path.join(self.disk_dir, f"{digest}.pkl")
+
+    def _load_disk(self, key):
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, 'rb') as f:
+                stored_key, value = pickle.load(f)
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # Truncated, corrupt or written by an incompatible version: treat
+            # it as a miss and drop the file so it is rewritten
+            with contextlib.suppress(OSError):
+                os.remove(path)
+            return None
+        # Guard against digest collisions
+        return (value,) if stored_key == key else None
+
+    def _save_disk(self, key, value):
+        if not self.disk_dir:
+            return
+        os.makedirs(self.disk_dir, exist_ok=True)
+        path = self._disk_path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump((key, value), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        evict_cache(self.disk_max_bytes, directory=self.disk_dir, suffix='.pkl')
+
+    def _store(self, key, value):
+        size = _nbytes(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+
+    def get_or_compute(self, key, compute):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+
+        stored = self._load_disk(key)
+        if stored is not None:
+            with self._lock:
+                self.disk_hits += 1
+            self._store(key, stored[0])
+            return stored[0]
+
+        with self._lock:
+            self.misses += 1
+        value = compute()
+        self._store(key, value)
+        self._save_disk(key, value)
+        return value
+
+    def memoize(self, func):
+        """
+        Decorator keying calls by the function name plus argument fingerprints.
+        """
+        name = f"{func.__module__}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = (name, tuple(fingerprint(arg) for arg in args),
+                   tuple(sorted((k, fingerprint(v)) for k, v in kwargs.items())))
+            try:
+                hash(key)
+            except TypeError:
+                # Unhashable arguments (lists, dicts) are simply not cached
+                return func(*args, **kwargs)
+            return self.get_or_compute(key, lambda: func(*args, **kwargs))
+
+        wrapper.uncached = func
+        return wrapper
+
+    def cache_info(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'disk_hits': self.disk_hits,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.hits = self.misses = self.disk_hits = 0
+
+# Shared cache used by the functions in financial_calculations
+indicator_cache = IndicatorCache()
+memoize = indicator_cache.memoize
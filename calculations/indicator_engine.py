@@ -0,0 +1,186 @@
+# calculations/indicator_engine.py
+
+import numpy as np
+
+INDICATORS = ("RSI", "MACD", "Signal", "Volatility")
+
+def rolling_sum(values, window):
+    # Window sums along the date axis from one cumulative sum
+    sums = np.full(values.shape, np.nan)
+    if len(values) < window:
+        return sums
+    cumsum = np.cumsum(values, axis=0)
+    sums[window - 1] = cumsum[window - 1]
+    sums[window:] = cumsum[window:] - cumsum[:-window]
+    return sums
+
+def _ewm_with_gaps(values, alpha):
+    # pandas' adjust=False recurrence, step by step, for columns with gaps
+    out = np.empty(values.shape)
+    weighted = values[0].copy()
+    old_wt = np.ones(values.shape[1:])
+    out[0] = weighted
+    for i in range(1, len(values)):
+        current = values[i]
+        is_obs = ~np.isnan(current)
+        started = ~np.isnan(weighted)
+
+        # Before the first observation the mean is just the first value seen
+        weighted = np.where(~started & is_obs, current, weighted)
+
+        # After it, missing values keep decaying the weight of the old mean
+        old_wt = np.where(started, old_wt * (1.0 - alpha), old_wt)
+        update = started & is_obs
+        blended = (old_wt * weighted + alpha * np.where(is_obs, current, 0.0)) / (old_wt + alpha)
+        weighted = np.where(update, blended, weighted)
+        old_wt = np.where(update, 1.0, old_wt)
+        out[i] = weighted
+    return out
+
+def _ewm_no_gaps(values, leading, alpha, block=64):
+    # With only leading gaps, back-filling them with the first observation
+    # leaves the recurrence unchanged from that observation on
+    first = np.argmax(~leading, axis=0)
+    filled = np.where(leading, values[first, np.arange(values.shape[1])], values)
+
+    # Within a block of rows the recurrence is a lower-triangular matrix
+    # product, so the time loop runs once per block instead of once per row
+    steps = np.arange(block)
+    lags = steps[:, None] - steps[None, :]
+    weights = np.where(lags >= 0, alpha * (1.0 - alpha) ** np.maximum(lags, 0), 0.0)
+    carry = (1.0 - alpha) ** (steps + 1)
+
+    out = np.empty(values.shape)
+    previous = filled[0]
+    for start in range(0, len(values), block):
+        chunk = filled[start:start + block]
+        rows = len(chunk)
+        out[start:start + rows] = weights[:rows, :rows] @ chunk + carry[:rows, None] * previous
+        previous = out[start + rows - 1]
+    out[leading] = np.nan
+    return out
+
+def ewm_mean(values, span):
+    """
+    Column-wise equivalent of Series.ewm(span=span, adjust=False).mean(),
+    including pandas' handling of missing values.
+    """
+    alpha = 2.0 / (span + 1.0)
+    out = np.full(values.shape, np.nan)
+    if len(values) == 0:
+        return out
+
+    missing = np.isnan(values)
+    leading = ~np.logical_or.accumulate(~missing, axis=0)
+    has_gaps = (missing & ~leading).any(axis=0)
+
+    if (~has_gaps).any():
+        out[:, ~has_gaps] = _ewm_no_gaps(values[:, ~has_gaps], leading[:, ~has_gaps], alpha)
+    if has_gaps.any():
+        out[:, has_gaps] = _ewm_with_gaps(values[:, has_gaps], alpha)
+    return out
+
+def rsi(close, window=14):
+    """
+    Column-wise equivalent of calculate_rsi for a (dates, tickers) array.
+    """
+    delta = np.full(close.shape, np.nan)
+    delta[1:] = close[1:] - close[:-1]
+    # calculate_rsi's where(..., 0) turns missing deltas into zeros
+    gain = np.where(delta > 0, delta, 0.0)
+    loss = np.where(delta < 0, -delta, 0.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rs = rolling_sum(gain, window) / rolling_sum(loss, window)
+        return 100 - (100 / (1 + rs))
+
+def macd(close, short_window=12, long_window=26, signal_window=9):
+    """
+    Column-wise equivalent of calculate_macd. Returns (macd, signal) arrays.
+    """
+    macd_line = ewm_mean(close, short_window) - ewm_mean(close, long_window)
+    return macd_line, ewm_mean(macd_line, signal_window)
+
+def volatility(close, window=14):
+    """
+    Column-wise equivalent of calculate_volatility (annualized rolling std).
+    """
+    returns = np.full(close.shape, np.nan)
+    returns[1:] = close[1:] / close[:-1] - 1
+    missing = np.isnan(returns)
+
+    # Center each column first so the sum-of-squares formula stays accurate
+    returns[missing] = 0.0
+    counts = np.maximum((~missing).sum(axis=0), 1)
+    centered = np.where(missing, 0.0, returns - returns.sum(axis=0) / counts)
+
+    sums = rolling_sum(centered, window)
+    squares = rolling_sum(centered ** 2, window)
+    variance = np.maximum(squares - sums ** 2 / window, 0.0) / (window - 1)
+    # A window with any missing return has no value, as in Series.rolling
+    if missing[1:].any():
+        variance[rolling_sum(missing.astype(float), window) != 0] = np.nan
+    else:
+        variance[:window] = np.nan
+    return np.sqrt(variance) * np.sqrt(252)
+
+def compute_indicators(close, indicators=INDICATORS, rsi_window=14, short_window=12, long_window=26,
+                       signal_window=9, volatility_window=14, dtype=np.float64):
+    """
+    Compute the requested indicators for a (dates, tickers) close-price array
+    in one vectorized pass. Returns a dict of indicator name to array with the
+    same shape as close.
+    """
+    close = np.asarray(close, dtype=np.float64)
+    if close.ndim == 1:
+        close = close[:, None]
+
+    block = {}
+    if "RSI" in indicators:
+        block["RSI"] = rsi(close, rsi_window)
+    if "MACD" in indicators or "Signal" in indicators:
+        macd_line, signal = macd(close, short_window, long_window, signal_window)
+        if "MACD" in indicators:
+            block["MACD"] = macd_line
+        if "Signal" in indicators:
+            block["Signal"] = signal
+    if "Volatility" in indicators:
+        block["Volatility"] = volatility(close, volatility_window)
+    return {name: values.astype(dtype, copy=False) for name, values in block.items()}
+
+# Benchmark against the per-Series functions
+if __name__ == "__main__":
+    import time
+    from data.providers import SyntheticProvider
+    from calculations.financial_calculations import calculate_rsi, calculate_macd, calculate_volatility
+
+    tickers = [f"T{i:04d}" for i in range(1000)]
+    data = SyntheticProvider(seed=42).download(tickers, "2015-01-01", "2025-01-01")
+    close_frame = data.xs("Close", axis=1, level=1)
+    print(f"Universe: {close_frame.shape[1]} tickers x {close_frame.shape[0]} days")
+
+    # Time the raw computation, not the memoization layer
+    calculate_rsi, calculate_macd, calculate_volatility = (
+        calculate_rsi.uncached, calculate_macd.uncached, calculate_volatility.uncached
+    )
+
+    start = time.perf_counter()
+    loop_results = {}
+    for ticker in tickers:
+        close = close_frame[ticker]
+        macd_frame = calculate_macd(close)
+        loop_results[ticker] = (calculate_rsi(close), macd_frame["MACD"], macd_frame["Signal"],
+                                calculate_volatility(close))
+    loop_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    block = compute_indicators(close_frame.to_numpy())
+    engine_time = time.perf_counter() - start
+
+    print(f"Per-Series loop:  {loop_time:.3f}s")
+    print(f"Vectorized engine: {engine_time:.3f}s ({loop_time / engine_time:.1f}x faster)")
+
+    for position, name in enumerate(INDICATORS):
+        expected = np.column_stack([loop_results[ticker][position].to_numpy() for ticker in tickers])
+        difference = np.nanmax(np.abs(block[name] - expected))
+        same_missing = np.array_equal(np.isnan(block[name]), np.isnan(expected))
+        print(f"{name}: max abs difference {difference:.2e}, same missing values: {same_missing}")
@@ -0,0 +1,114 @@
+# calculations/parallel_runner.py
+
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from calculations.indicator_engine import INDICATORS, compute_indicators
+from calculations.rolling_statistics import rolling_beta_correlation
+from data.compact_prices import CompactPrices
+from data.price_store import (
+    allocate_price_store,
+    current_version,
+    open_price_store,
+    publish_price_store,
+    write_price_store
+)
+
+OUTPUT_FIELDS = INDICATORS + ("Beta", "Correlation")
+
+def _run_shard(input_dir, input_version, output_dir, output_version, start, stop, benchmark_code, window, params):
+    # Runs in a worker process: both stores are memory-mapped, so only these
+    # arguments are pickled, never price data
+    prices = open_price_store(input_dir, input_version)
+    close = prices.field('Close')
+    block = compute_indicators(close[:, start:stop], **params)
+
+    if benchmark_code is not None:
+        shard_close = np.asarray(close[:, start:stop], dtype=np.float64)
+        benchmark_close = np.asarray(close[:, benchmark_code], dtype=np.float64)
+        returns = np.full(shard_close.shape, np.nan)
+        returns[1:] = shard_close[1:] / shard_close[:-1] - 1
+        benchmark_returns = np.full(benchmark_close.shape, np.nan)
+        benchmark_returns[1:] = benchmark_close[1:] / benchmark_close[:-1] - 1
+        block["Beta"], block["Correlation"] = rolling_beta_correlation(returns, benchmark_returns, window)
+
+    output = np.load(os.path.join(output_dir, output_version, 'prices.npy'), mmap_mode='r+')
+    for code, field in enumerate(OUTPUT_FIELDS):
+        if field in block:
+            output[code, :, start:stop] = block[field]
+    output.flush()
+    return stop - start
+
+def run_universe(prices, output_dir, benchmark=None, window=63, workers=None, shard_size=None,
+                 input_dir=None, dtype=np.float32, **params):
+    """
+    Compute RSI, MACD, Signal, Volatility and (with a benchmark ticker) rolling
+    Beta and Correlation for a whole universe on a process pool.
+
+    prices is a (ticker, field) frame, CompactPrices, or None to use the price
+    store at input_dir. Tickers are sharded across workers, which read closes
+    from the memory-mapped price store and write their columns straight into
+    one output store in output_dir (fields in OUTPUT_FIELDS, readable with
+    open_price_store). Returns the published output version.
+    """
+    temporary_input = None
+    if prices is not None:
+        # Publish the input as a store so workers can map it instead of unpickling it
+        temporary_input = tempfile.TemporaryDirectory(prefix='price_store_')
+        input_dir = temporary_input.name
+        if not isinstance(prices, CompactPrices):
+            prices = CompactPrices.from_frame(prices, dtype=np.float64)
+        write_price_store(prices, input_dir)
+
+    try:
+        # Pin the version so a refresh mid-run can't mix two inputs
+        input_version = current_version(input_dir)
+        source = open_price_store(input_dir, input_version)
+        n_tickers = len(source.tickers)
+        benchmark_code = source.ticker_codes[benchmark] if benchmark is not None else None
+
+        os.makedirs(output_dir, exist_ok=True)
+        output_version, output = allocate_price_store(source.index.values, source.tickers, OUTPUT_FIELDS,
+                                                      output_dir, dtype=dtype)
+        output[:] = np.nan
+        output.flush()
+        del output
+
+        workers = workers or os.cpu_count() or 1
+        shard_size = shard_size or max(1, -(-n_tickers // (workers * 4)))
+        shards = [(start, min(start + shard_size, n_tickers)) for start in range(0, n_tickers, shard_size)]
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(_run_shard, input_dir, input_version, output_dir, output_version,
+                                start, stop, benchmark_code, window, params)
+                for start, stop in shards
+            ]
+            for future in futures:
+                future.result()
+    finally:
+        if temporary_input is not None:
+            temporary_input.cleanup()
+
+    publish_price_store(output_version, output_dir)
+    return output_version
+
+# Nightly-style run over a synthetic universe
+if __name__ == "__main__":
+    import argparse
+    import time
+    from data.providers import SyntheticProvider
+
+    parser = argparse.ArgumentParser(description="Run universe-wide indicators on a process pool.")
+    parser.add_argument('--tickers', type=int, default=2000)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--output', default='data/indicator_store')
+    args = parser.parse_args()
+
+    tickers = ["BENCH"] + [f"T{i:04d}" for i in range(args.tickers - 1)]
+    prices = SyntheticProvider(seed=7).download(tickers, "2015-01-01", "2025-01-01")
+
+    start = time.perf_counter()
+    version = run_universe(prices, args.output, benchmark="BENCH", workers=args.workers)
+    print(f"Published {version} for {len(tickers)} tickers in {time.perf_counter() - start:.2f}s")
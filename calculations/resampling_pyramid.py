@@ -0,0 +1,168 @@
+# calculations/resampling_pyramid.py
+
+import numpy as np
+import pandas as pd
+
+# Levels from finest to coarsest, labelled by the start of each period
+LEVELS = ("D", "W", "M", "Q")
+FIELDS = ("Open", "High", "Low", "Close", "Volume", "Pct Change Sum")
+
+def _period_starts(dates, level):
+    dates = pd.DatetimeIndex(dates)
+    if level == "D":
+        return dates.normalize()
+    return dates.to_period(level).start_time
+
+class _GrowableBlock:
+    # (periods, tickers) arrays with spare capacity, so appending a period
+    # does not copy the whole history every time
+    def __init__(self, values):
+        self._values = values
+        self.length = len(values)
+
+    def append(self, row):
+        if self.length == len(self._values):
+            spare = np.full((max(self.length, 16),) + self._values.shape[1:], np.nan)
+            self._values = np.concatenate([self._values, spare])
+        self._values[self.length] = row
+        self.length += 1
+
+    @property
+    def values(self):
+        return self._values[:self.length]
+
+class ResamplingPyramid:
+    """
+    Daily, weekly, monthly and quarterly OHLCV bars plus the sum of daily
+    percentage changes for every ticker, kept up to date as new daily bars
+    are appended. Aggregation follows DataFrame.resample: first/last/max/min
+    skip missing values and sums treat them as zero.
+    """
+    def __init__(self, data):
+        data = data.sort_index()
+        self.tickers = list(data.columns.get_level_values(0).unique())
+        daily = {field: self._field(data, field) for field in FIELDS[:5]}
+        close = daily["Close"]
+        daily["Pct Change Sum"] = close / close.shift(1) - 1
+
+        # Last close per ticker, for the percentage change of the next bar
+        self._last_close = close.iloc[-1].to_numpy() if len(close) else np.full(len(self.tickers), np.nan)
+
+        self._labels = {}
+        self._label_index = {}
+        self._blocks = {}
+        for level in LEVELS:
+            labels = _period_starts(data.index, level)
+            aggregated = {
+                "Open": daily["Open"].groupby(labels).first(),
+                "High": daily["High"].groupby(labels).max(),
+                "Low": daily["Low"].groupby(labels).min(),
+                "Close": daily["Close"].groupby(labels).last(),
+                "Volume": daily["Volume"].groupby(labels).sum(),
+                "Pct Change Sum": daily["Pct Change Sum"].groupby(labels).sum()
+            }
+            self._labels[level] = list(aggregated["Close"].index)
+            self._blocks[level] = {
+                field: _GrowableBlock(frame.to_numpy(dtype=np.float64)) for field, frame in aggregated.items()
+            }
+
+    def _field(self, data, field):
+        columns = pd.MultiIndex.from_product([self.tickers, [field]])
+        frame = data.reindex(columns=columns)
+        frame.columns = self.tickers
+        return frame.astype(np.float64)
+
+    def append(self, data):
+        """
+        Fold new daily bars (a (ticker, field) frame dated after the last bar)
+        into every level. Costs O(new bars x levels), not O(history).
+        """
+        data = data.sort_index()
+        last_date = self._labels["D"][-1] if self._labels["D"] else None
+        if last_date is not None and len(data) and data.index[0] <= last_date:
+            raise ValueError("append() only accepts bars after the last stored date")
+
+        fields = {field: self._field(data, field).to_numpy() for field in FIELDS[:5]}
+        new_labels = {level: _period_starts(data.index, level) for level in LEVELS}
+        for row in range(len(data.index)):
+            bar = {field: values[row] for field, values in fields.items()}
+            with np.errstate(invalid='ignore', divide='ignore'):
+                bar["Pct Change Sum"] = bar["Close"] / self._last_close - 1
+            self._last_close = bar["Close"]
+
+            for level in LEVELS:
+                label = new_labels[level][row]
+                if self._labels[level] and self._labels[level][-1] == label:
+                    self._merge_last(level, bar)
+                else:
+                    self._labels[level].append(label)
+                    self._label_index.pop(level, None)
+                    for field in FIELDS:
+                        value = bar[field]
+                        if field in ("Volume", "Pct Change Sum"):
+                            value = np.nan_to_num(value)
+                        self._blocks[level][field].append(value)
+
+    def _merge_last(self, level, bar):
+        block = self._blocks[level]
+        last = {field: block[field].values[-1] for field in FIELDS}
+        last["Open"][:] = np.where(np.isnan(last["Open"]), bar["Open"], last["Open"])
+        last["High"][:] = np.fmax(last["High"], bar["High"])
+        last["Low"][:] = np.fmin(last["Low"], bar["Low"])
+        last["Close"][:] = np.where(np.isnan(bar["Close"]), last["Close"], bar["Close"])
+        last["Volume"][:] += np.nan_to_num(bar["Volume"])
+        last["Pct Change Sum"][:] += np.nan_to_num(bar["Pct Change Sum"])
+
+    def labels(self, level):
+        # DatetimeIndex of period starts, rebuilt only after new periods
+        if level not in self._label_index:
+            self._label_index[level] = pd.DatetimeIndex(self._labels[level])
+        return self._label_index[level]
+
+    def level_for(self, start_date, end_date, max_points=500):
+        """
+        The finest level that shows [start_date, end_date] in at most max_points
+        periods, falling back to the coarsest level.
+        """
+        for level in LEVELS:
+            labels = self.labels(level)
+            first = labels.searchsorted(_period_starts([start_date], level)[0], side='left')
+            last = labels.searchsorted(pd.Timestamp(end_date), side='right')
+            if last - first <= max_points:
+                return level
+        return LEVELS[-1]
+
+    @staticmethod
+    def last_rows(dates, level):
+        """
+        Positions of the last of dates in each period of level, for thinning
+        daily series (indicators, say) to one point per period on a chart.
+        """
+        labels = _period_starts(dates, level)
+        if not len(labels):
+            return np.arange(0)
+        return np.flatnonzero(np.append(labels[1:] != labels[:-1], True))
+
+    def get(self, field, level="D", start_date=None, end_date=None):
+        """
+        One field at one level as a (periods, tickers) DataFrame, restricted to
+        periods starting in [start_date, end_date]. field may also be 'Return',
+        the compounded return of each period.
+        """
+        labels = self.labels(level)
+        if field == "Return":
+            close = pd.DataFrame(self._blocks[level]["Close"].values, index=labels, columns=self.tickers)
+            frame = close / close.ffill().shift(1) - 1
+        else:
+            frame = pd.DataFrame(self._blocks[level][field].values, index=labels, columns=self.tickers)
+        first = labels.searchsorted(_period_starts([start_date], level)[0]) if start_date is not None else 0
+        last = labels.searchsorted(pd.Timestamp(end_date), side='right') if end_date is not None else len(labels)
+        return frame.iloc[first:last]
+
+    def beta(self, ticker, benchmark, level="M", start_date=None, end_date=None):
+        """
+        Beta of ticker against benchmark from summed percentage changes per
+        period; with level 'M' this is calculate_beta_monthly.
+        """
+        pct_sums = self.get("Pct Change Sum", level, start_date, end_date)
+        return pct_sums[ticker].cov(pct_sums[benchmark]) / pct_sums[benchmark].var()
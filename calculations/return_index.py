@@ -0,0 +1,91 @@
+# calculations/return_index.py
+
+import numpy as np
+import pandas as pd
+
+class ReturnIndex:
+    """
+    Prefix sums of log returns, simple returns and squared returns over a
+    sorted date array, for one or many tickers. Any date-range query is two
+    binary searches and a subtraction, whatever the length of the history.
+    Missing prices are forward-filled, so they contribute a zero return.
+    """
+    def __init__(self, dates, close, tickers=None):
+        close = np.asarray(close, dtype=np.float64)
+        if close.ndim == 1:
+            close = close[:, None]
+        self.dates = np.asarray(dates, dtype='datetime64[ns]')
+        self.tickers = list(tickers) if tickers is not None else list(range(close.shape[1]))
+        self._positions = {ticker: i for i, ticker in enumerate(self.tickers)}
+
+        close = pd.DataFrame(close).ffill().to_numpy()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            returns = np.where(np.isnan(close[:-1]), 0.0, close[1:] / close[:-1] - 1)
+            log_returns = np.log1p(returns)
+        returns = np.nan_to_num(returns, nan=0.0)
+        log_returns = np.nan_to_num(log_returns, nan=0.0)
+
+        # Row k holds the sums over returns 1..k, so row 0 is zero
+        zeros = np.zeros((1, close.shape[1]))
+        self.cum_log = np.vstack([zeros, np.cumsum(log_returns, axis=0)])
+        self.cum_returns = np.vstack([zeros, np.cumsum(returns, axis=0)])
+        self.cum_squares = np.vstack([zeros, np.cumsum(returns ** 2, axis=0)])
+
+    @classmethod
+    def from_frame(cls, data, field="Close"):
+        """
+        Build the index from a (ticker, field) price frame.
+        """
+        prices = data.xs(field, axis=1, level=1).sort_index()
+        return cls(prices.index.values, prices.to_numpy(), prices.columns)
+
+    def _bounds(self, start_date, end_date):
+        # First date on or after start, last date on or before end
+        first = np.searchsorted(self.dates, np.datetime64(pd.Timestamp(start_date), 'ns'), side='left')
+        last = np.searchsorted(self.dates, np.datetime64(pd.Timestamp(end_date), 'ns'), side='right') - 1
+        return first, last
+
+    def _column(self, values, ticker):
+        return values if ticker is None else values.T[self._positions[ticker]]
+
+    def period_stats(self, start_date, end_date, ticker=None):
+        """
+        Total return, annualized growth, mean daily return and annualized
+        volatility between two dates (inclusive), for one ticker or all of them.
+        """
+        first, last = self._bounds(start_date, end_date)
+        n_returns = last - first
+        if n_returns < 1:
+            nan = self._column(np.full(len(self.tickers), np.nan), ticker)
+            return {'total_return': nan, 'annual_growth': nan, 'mean_return': nan, 'volatility': nan}
+
+        log_growth = self.cum_log[last] - self.cum_log[first]
+        sums = self.cum_returns[last] - self.cum_returns[first]
+        squares = self.cum_squares[last] - self.cum_squares[first]
+        years = (self.dates[last] - self.dates[first]) / np.timedelta64(1, 'D') / 365.25
+
+        mean_return = sums / n_returns
+        if n_returns > 1:
+            variance = np.maximum(squares - sums ** 2 / n_returns, 0.0) / (n_returns - 1)
+            volatility = np.sqrt(variance) * np.sqrt(252)
+        else:
+            volatility = np.full(sums.shape, np.nan)
+
+        return {
+            'total_return': self._column(np.expm1(log_growth), ticker),
+            'annual_growth': self._column(np.expm1(log_growth / years), ticker),
+            'mean_return': self._column(mean_return, ticker),
+            'volatility': self._column(volatility, ticker)
+        }
+
+    def cumulative_returns(self, start_date, end_date, ticker=None):
+        """
+        Cumulative return from the first date in the range to each later date,
+        without rescanning the prices.
+        """
+        first, last = self._bounds(start_date, end_date)
+        growth = np.expm1(self.cum_log[first:last + 1] - self.cum_log[first])
+        dates = pd.DatetimeIndex(self.dates[first:last + 1])
+        if ticker is not None:
+            return pd.Series(self._column(growth, ticker), index=dates, name=ticker)
+        return pd.DataFrame(growth, index=dates, columns=self.tickers)
@@ -0,0 +1,100 @@
+# calculations/rolling_statistics.py
+
+import numpy as np
+import pandas as pd
+from calculations.indicator_engine import rolling_sum
+
+# Upper bound on working memory for one block of tickers
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+def _centered(values, missing):
+    # Subtract each column's mean so window moments don't lose precision;
+    # missing entries become zero and their windows are masked afterwards
+    counts = np.maximum((~missing).sum(axis=0), 1)
+    means = np.where(missing, 0.0, values).sum(axis=0) / counts
+    return np.where(missing, 0.0, values - means)
+
+def rolling_beta_correlation(returns, benchmark, window=63, max_bytes=DEFAULT_MAX_BYTES, dtype=np.float64):
+    """
+    Rolling beta and correlation of every column of a (dates, tickers) returns
+    array against a benchmark returns vector, from windowed sums of x, x^2
+    and x*y. Tickers are processed in blocks sized to max_bytes. Windows
+    containing a missing return in either series are NaN.
+    Returns (beta, correlation) arrays shaped like returns.
+    """
+    returns = np.asarray(returns, dtype=np.float64)
+    if returns.ndim == 1:
+        returns = returns[:, None]
+    benchmark = np.asarray(benchmark, dtype=np.float64).ravel()
+    n_dates, n_tickers = returns.shape
+
+    benchmark_missing = np.isnan(benchmark)[:, None]
+    y = _centered(benchmark[:, None], benchmark_missing)
+    y_sums = rolling_sum(y, window)
+    y_var = (rolling_sum(y * y, window) - y_sums ** 2 / window) / (window - 1)
+
+    beta = np.empty(returns.shape, dtype=dtype)
+    correlation = np.empty(returns.shape, dtype=dtype)
+
+    # Roughly ten float64 temporaries of (dates, block) are alive at once
+    block = max(1, max_bytes // (10 * 8 * max(n_dates, 1)))
+    for start in range(0, n_tickers, block):
+        stop = min(start + block, n_tickers)
+        values = returns[:, start:stop]
+        missing = np.isnan(values) | benchmark_missing
+        x = _centered(values, missing)
+
+        x_sums = rolling_sum(x, window)
+        covariance = (rolling_sum(x * y, window) - x_sums * y_sums / window) / (window - 1)
+        x_var = (rolling_sum(x * x, window) - x_sums ** 2 / window) / (window - 1)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            block_beta = covariance / y_var
+            block_correlation = covariance / np.sqrt(np.maximum(x_var, 0.0) * np.maximum(y_var, 0.0))
+        invalid = rolling_sum(missing.astype(np.float64), window) != 0
+        block_beta[invalid] = np.nan
+        block_correlation[invalid] = np.nan
+
+        beta[:, start:stop] = block_beta
+        correlation[:, start:stop] = block_correlation
+
+    return beta, correlation
+
+def rolling_correlation_matrix(returns, window=63, end_positions=None):
+    """
+    All-pairs correlation of a (dates, tickers) returns array over the window
+    ending at each row in end_positions (default: the last row).
+    Returns an array of shape (len(end_positions), tickers, tickers).
+    """
+    returns = np.asarray(returns, dtype=np.float64)
+    n_dates, n_tickers = returns.shape
+    if end_positions is None:
+        end_positions = [n_dates - 1]
+
+    matrices = np.full((len(end_positions), n_tickers, n_tickers), np.nan)
+    for i, end in enumerate(end_positions):
+        if end + 1 < window:
+            continue
+        values = returns[end + 1 - window:end + 1]
+        complete = ~np.isnan(values).any(axis=0)
+        centered = values[:, complete] - values[:, complete].mean(axis=0)
+        scaled = centered / np.sqrt((centered ** 2).sum(axis=0))
+        with np.errstate(invalid='ignore'):
+            matrices[i][np.ix_(complete, complete)] = scaled.T @ scaled
+    return matrices
+
+def rolling_beta(data, benchmark="QQQ", window=63, field="Close", max_bytes=DEFAULT_MAX_BYTES):
+    """
+    Rolling beta and correlation of every ticker in a (ticker, field) price
+    frame against the benchmark ticker. The input frame is not modified.
+    Returns (beta, correlation) DataFrames with one column per ticker.
+    """
+    prices = data.xs(field, axis=1, level=1)
+    returns = prices / prices.shift(1) - 1
+    beta, correlation = rolling_beta_correlation(
+        returns.to_numpy(), returns[benchmark].to_numpy(), window, max_bytes
+    )
+    return (
+        pd.DataFrame(beta, index=prices.index, columns=prices.columns),
+        pd.DataFrame(correlation, index=prices.index, columns=prices.columns)
+    )
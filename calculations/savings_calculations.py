@@ -1,27 +1,359 @@
 # savings_investment.py
 
+import csv
 import math
+import os
+import time
+import numpy as np
+import pandas as pd
 
 # Function to calculate the required contribution to reach the savings goal
-def calculate_required_contribution(current_balance, goal_amount, contribution_frequency, timeframe_months):
-    # Ensure the frequency is correct
-    frequency_factor = 12 if contribution_frequency.lower() == 'monthly' else 52
-    total_contributions_needed = goal_amount - current_balance
-    required_contribution = total_contributions_needed / timeframe_months
-    return required_contribution
+# Inverts calculate_investment_projection for the contribution, so returns and the
+# contribution frequency are taken into account; accepts scalars or NumPy arrays
+# (e.g. a whole client book) and returns 0 where the goal is already reached
+def calculate_required_contribution(current_balance, goal_amount, contribution_frequency, timeframe_months, annual_return_rate=0.0):
+    frequency_factor = get_frequency_factor(contribution_frequency)
+    balance_growth = _future_value(current_balance, 0.0, frequency_factor, timeframe_months, annual_return_rate)
+    annuity_factor = _future_value(0.0, 1.0, frequency_factor, timeframe_months, annual_return_rate)
+    required_contribution = np.maximum((np.asarray(goal_amount, dtype=float) - balance_growth) / annuity_factor, 0.0)
+    return required_contribution.item() if np.ndim(required_contribution) == 0 else required_contribution
+
+# Number of contributions per year for a contribution frequency
+def get_frequency_factor(contribution_frequency):
+    return 12 if contribution_frequency.lower() == 'monthly' else 52
+
+# Future value of balance + contributions; broadcasts over NumPy arrays
+def _future_value(current_balance, contribution, frequency_factor, timeframe_months, annual_return_rate):
+    r = np.asarray(annual_return_rate, dtype=float) / frequency_factor
+    n = np.asarray(timeframe_months, dtype=float) * (frequency_factor / 12)
+
+    # (1 + r) ** n - 1 computed without cancellation for small r
+    growth_minus_one = np.expm1(n * np.log1p(r))
+    # The annuity factor ((1 + r) ** n - 1) / r tends to n as r -> 0
+    safe_r = np.where(r == 0, 1.0, r)
+    annuity_factor = np.where(r == 0, n, growth_minus_one / safe_r)
+    return current_balance * (growth_minus_one + 1) + contribution * annuity_factor
 
 # Function to calculate the future value of the savings with investment growth
+# Accepts scalars or NumPy arrays (broadcast together); a zero return rate is allowed
 def calculate_investment_projection(current_balance, contribution, contribution_frequency, timeframe_months, annual_return_rate):
-    frequency_factor = 12 if contribution_frequency.lower() == 'monthly' else 52
-    r = annual_return_rate / frequency_factor
-    n = timeframe_months * (frequency_factor / 12)
+    frequency_factor = get_frequency_factor(contribution_frequency)
+    future_value = _future_value(current_balance, contribution, frequency_factor, timeframe_months, annual_return_rate)
+    return future_value.item() if np.ndim(future_value) == 0 else future_value
+
+# Function to evaluate every combination of the given parameter values
+# Each array argument gets its own axis, in argument order; scalars add no axis
+def calculate_projection_grid(current_balance, contribution, contribution_frequency, timeframe_months, annual_return_rate):
+    params = [np.asarray(value, dtype=float) for value in
+              (current_balance, contribution, timeframe_months, annual_return_rate)]
+    open_grid = iter(np.ix_(*[value for value in params if value.ndim > 0]))
+    current_balance, contribution, timeframe_months, annual_return_rate = [
+        next(open_grid) if value.ndim > 0 else value for value in params
+    ]
+    frequency_factor = get_frequency_factor(contribution_frequency)
+    return _future_value(current_balance, contribution, frequency_factor, timeframe_months, annual_return_rate)
+
+# Columns of a savings schedule, one row per contribution period
+SCHEDULE_FIELDS = ('period', 'contribution', 'interest', 'total_contributed', 'balance')
+
+# Generator yielding the schedule one period at a time, so long horizons never
+# hold more than one period in memory. Each period earns interest on the
+# opening balance, then the contribution is added (as in _future_value).
+# The schedule has whole periods only: timeframe_months * frequency / 12 rounded
+# to the nearest integer. calculate_investment_projection compounds the exact
+# (possibly fractional) count, so the two differ when the timeframe is not a
+# whole number of periods (e.g. 7 months of weekly contributions).
+# Array arguments (e.g. many clients) broadcast; each yielded value is then an array.
+def iter_savings_schedule(current_balance, contribution, contribution_frequency, timeframe_months, annual_return_rate):
+    frequency_factor = get_frequency_factor(contribution_frequency)
+    n_periods = int(round(timeframe_months * frequency_factor / 12))
+    r = np.asarray(annual_return_rate, dtype=float) / frequency_factor
+    balance, contribution = np.broadcast_arrays(np.asarray(current_balance, dtype=float),
+                                                np.asarray(contribution, dtype=float))
+    balance = balance + 0 * r
+    total_contributed = np.zeros_like(balance)
+
+    for period in range(1, n_periods + 1):
+        interest = balance * r
+        balance = balance + interest + contribution
+        total_contributed = total_contributed + contribution
+        values = [value.item() if value.ndim == 0 else value for value in (contribution, interest, total_contributed, balance)]
+        yield dict(zip(SCHEDULE_FIELDS, [period] + values))
+
+# Function to calculate the whole schedule at once as NumPy arrays, for charting
+# Returns a dict of SCHEDULE_FIELDS arrays with periods along the first axis;
+# the period count is rounded as in iter_savings_schedule
+def calculate_savings_schedule(current_balance, contribution, contribution_frequency, timeframe_months, annual_return_rate):
+    frequency_factor = get_frequency_factor(contribution_frequency)
+    n_periods = int(round(timeframe_months * frequency_factor / 12))
+    r = np.asarray(annual_return_rate, dtype=float) / frequency_factor
+    current_balance = np.asarray(current_balance, dtype=float)
+    contribution = np.asarray(contribution, dtype=float)
+
+    period = np.arange(n_periods + 1, dtype=float).reshape((-1,) + (1,) * np.ndim(
+        np.broadcast(current_balance, contribution, r)))
+    # Closed-form balance after each period, including the opening balance
+    balances = _future_value(current_balance, contribution, frequency_factor, period * 12 / frequency_factor,
+                             annual_return_rate)
+    return {
+        'period': np.arange(1, n_periods + 1),
+        'contribution': np.broadcast_to(contribution, balances[1:].shape),
+        'interest': balances[:-1] * r,
+        'total_contributed': np.broadcast_to(period[1:] * contribution, balances[1:].shape),
+        'balance': balances[1:]
+    }
+
+# Function to stream the schedule to a CSV file (path or open file) row by row
+# Array arguments are written with a leading 'client' column (flat position)
+def write_savings_schedule_csv(path_or_file, current_balance, contribution, contribution_frequency, timeframe_months,
+                               annual_return_rate):
+    many_clients = np.ndim(np.broadcast(current_balance, contribution, annual_return_rate)) > 0
+    schedule = iter_savings_schedule(current_balance, contribution, contribution_frequency, timeframe_months,
+                                     annual_return_rate)
+    f = open(path_or_file, 'w', newline='') if isinstance(path_or_file, (str, bytes, os.PathLike)) else path_or_file
+    try:
+        writer = csv.writer(f)
+        writer.writerow((('client',) if many_clients else ()) + SCHEDULE_FIELDS)
+        rows = 0
+        for row in schedule:
+            if many_clients:
+                columns = [np.broadcast_to(row[field], row['balance'].shape).ravel() for field in SCHEDULE_FIELDS[1:]]
+                writer.writerows((client, row['period'], *values) for client, values in enumerate(zip(*columns)))
+                rows += len(columns[0])
+            else:
+                writer.writerow([row[field] for field in SCHEDULE_FIELDS])
+                rows += 1
+    finally:
+        if f is not path_or_file:
+            f.close()
+    return rows
+
+# Per-period returns from a ticker's price history, for bootstrapped simulations
+def get_historical_period_returns(symbol="SPY", start_date="2000-01-01", end_date="2024-11-08", contribution_frequency='monthly'):
+    from data.data_fetch import fetch_data
+
+    close = fetch_data([symbol], start_date, end_date)[(symbol, "Close")].dropna()
+    rule = 'MS' if get_frequency_factor(contribution_frequency) == 12 else 'W'
+    return close.resample(rule).last().pct_change().dropna().to_numpy()
+
+# Fixed-size log-spaced histogram of final balances, so percentiles are
+# aggregated chunk by chunk without keeping every simulated value
+class _StreamingHistogram:
+    def __init__(self, first_values, bins=8192):
+        positive = first_values[first_values > 0]
+        low, high = (positive.min() / 4, positive.max() * 4) if len(positive) else (1.0, 2.0)
+        self.edges = np.geomspace(low, high, bins + 1)
+        # Counts for: non-positive, below range, each bin, above range
+        self.counts = np.zeros(bins + 3, dtype=np.int64)
+        self.minimum = np.inf
+        self.maximum = -np.inf
+
+    def add(self, values):
+        self.minimum = min(self.minimum, values.min())
+        self.maximum = max(self.maximum, values.max())
+        positions = np.searchsorted(self.edges, values, side='right') + 1
+        positions[values <= 0] = 0
+        self.counts += np.bincount(np.minimum(positions, len(self.counts) - 1), minlength=len(self.counts))
+
+    def percentile(self, q):
+        target = q / 100 * self.counts.sum()
+        cumulative = np.cumsum(self.counts)
+        slot = min(int(np.searchsorted(cumulative, target, side='left')), len(self.counts) - 1)
+        if slot <= 1:
+            return float(self.minimum)
+        if slot == len(self.counts) - 1:
+            return float(self.maximum)
+        # Interpolate geometrically inside the bin
+        before = cumulative[slot - 1]
+        fraction = (target - before) / self.counts[slot] if self.counts[slot] else 0.0
+        low, high = self.edges[slot - 2], self.edges[slot - 1]
+        return float(np.clip(low * (high / low) ** fraction, self.minimum, self.maximum))
+
+# Function to simulate savings with random returns (Monte Carlo)
+# Returns are normal with the given annual mean and volatility, or drawn from
+# historical_returns (per-period returns, see get_historical_period_returns).
+# Paths run in chunks of chunk_size, so memory stays bounded for any n_paths.
+def simulate_savings_monte_carlo(current_balance, contribution, contribution_frequency, timeframe_months,
+                                 annual_return_rate=0.07, annual_volatility=0.15, goal_amount=None,
+                                 n_paths=100_000, chunk_size=50_000, seed=None, historical_returns=None,
+                                 percentiles=(5, 25, 50, 75, 95)):
+    frequency_factor = get_frequency_factor(contribution_frequency)
+    n_periods = int(round(timeframe_months * frequency_factor / 12))
+    period_mean = annual_return_rate / frequency_factor
+    period_volatility = annual_volatility / np.sqrt(frequency_factor)
+    if historical_returns is not None:
+        historical_returns = np.asarray(historical_returns, dtype=float)
 
-    # Calculate future value of the contributions + balance
-    future_value = current_balance * ((1 + r) ** n) + contribution * (((1 + r) ** n - 1) / r)
-    return future_value
+    rng = np.random.default_rng(seed)
+    histogram = None
+    reached_goal = 0
+    total = 0.0
+
+    for start in range(0, n_paths, chunk_size):
+        size = min(chunk_size, n_paths - start)
+        balances = np.full(size, float(current_balance))
+        growth = np.empty(size)
+        for _ in range(n_periods):
+            # Growth factor 1 + return for each path, filled in place
+            if historical_returns is None:
+                rng.standard_normal(size, out=growth)
+                growth *= period_volatility
+                growth += 1 + period_mean
+            else:
+                np.take(historical_returns, rng.integers(len(historical_returns), size=size), out=growth)
+                growth += 1
+            balances *= growth
+            balances += contribution
+
+        if histogram is None:
+            histogram = _StreamingHistogram(balances)
+        histogram.add(balances)
+        total += balances.sum()
+        if goal_amount is not None:
+            reached_goal += int((balances >= goal_amount).sum())
+
+    return {
+        'percentiles': {q: histogram.percentile(q) for q in percentiles},
+        'mean': float(total / n_paths),
+        'probability_of_goal': reached_goal / n_paths if goal_amount is not None else None,
+        'n_paths': n_paths
+    }
+
+# Function to find the contribution that reaches the goal with a given probability
+# under simulated returns (see simulate_savings_monte_carlo). Every argument but
+# the frequency may be an array; all clients share the same simulated return
+# paths, so a client's answer does not depend on the rest of the book.
+# The final balance of a path is balance * G + contribution * A, so its break-even
+# contribution is (goal - balance * G) / A and the answer is the
+# success_probability quantile of those over the paths.
+def calculate_required_contribution_monte_carlo(current_balance, goal_amount, contribution_frequency, timeframe_months,
+                                                success_probability=0.9, annual_return_rate=0.07,
+                                                annual_volatility=0.15, n_paths=10_000, seed=0,
+                                                historical_returns=None, chunk_size=1_000_000):
+    frequency_factor = get_frequency_factor(contribution_frequency)
+    current_balance, goal_amount, timeframe_months, success_probability, annual_return_rate, annual_volatility = (
+        np.broadcast_arrays(*[np.asarray(value, dtype=float) for value in (
+            current_balance, goal_amount, timeframe_months, success_probability, annual_return_rate, annual_volatility
+        )])
+    )
+    shape = current_balance.shape
+    n_periods = np.rint(timeframe_months.ravel() * frequency_factor / 12).astype(np.int64)
+    period_mean = annual_return_rate.ravel() / frequency_factor
+    period_volatility = annual_volatility.ravel() / np.sqrt(frequency_factor)
+    if historical_returns is not None:
+        historical_returns = np.asarray(historical_returns, dtype=float)
+
+    required_contribution = np.empty(len(n_periods))
+    clients_per_chunk = max(1, chunk_size // n_paths)
+    for start in range(0, len(n_periods), clients_per_chunk):
+        clients = slice(start, start + clients_per_chunk)
+        periods = n_periods[clients][:, None]
+        # Same seed for every chunk: clients see identical return draws
+        rng = np.random.default_rng(seed)
+        balance_growth = np.ones((len(periods), n_paths))
+        annuity = np.zeros((len(periods), n_paths))
+        for period in range(int(periods.max(initial=0))):
+            if historical_returns is None:
+                draws = rng.standard_normal(n_paths)
+                growth = 1 + period_mean[clients][:, None] + period_volatility[clients][:, None] * draws
+            else:
+                growth = 1 + historical_returns[rng.integers(len(historical_returns), size=n_paths)]
+            # Clients whose horizon has ended stop growing and contributing
+            active = period < periods
+            growth = np.where(active, growth, 1.0)
+            balance_growth *= growth
+            annuity *= growth
+            annuity += active
+
+        shortfall = goal_amount.ravel()[clients][:, None] - current_balance.ravel()[clients][:, None] * balance_growth
+        # A zero-length horizon allows no contributions: met already or never
+        with np.errstate(divide='ignore', invalid='ignore'):
+            break_even = np.where(annuity > 0, shortfall / annuity, np.where(shortfall <= 0, 0.0, np.inf))
+        # Quantiles of the row positions give each client's order statistic in one
+        # call, with np.quantile's own inverted_cdf rounding
+        positions = np.quantile(np.arange(n_paths), success_probability.ravel()[clients], method='inverted_cdf')
+        break_even.sort(axis=1)
+        required_contribution[clients] = np.take_along_axis(
+            break_even, positions.astype(np.int64)[:, None], axis=1
+        )[:, 0]
+
+    required_contribution = np.maximum(required_contribution, 0.0).reshape(shape)
+    return required_contribution.item() if required_contribution.ndim == 0 else required_contribution
+
+# Columns a batch scenario file must provide, and the columns added to each row
+BATCH_INPUT_FIELDS = ('current_balance', 'goal_amount', 'contribution_frequency', 'contribution',
+                      'timeframe_months', 'annual_return_rate')
+BATCH_OUTPUT_FIELDS = ('required_contribution', 'future_value')
+
+# Read a CSV or JSONL scenario file (chosen by extension) chunk by chunk
+def _read_scenarios(path, chunk_size):
+    if path.endswith(('.jsonl', '.json')):
+        return pd.read_json(path, lines=True, chunksize=chunk_size)
+    return pd.read_csv(path, chunksize=chunk_size)
+
+# Function to evaluate one chunk of scenarios with array math
+# Rows with a bad frequency or non-numeric/negative inputs get NaN results
+def evaluate_scenarios(scenarios):
+    frequency = scenarios['contribution_frequency'].astype(str).str.strip().str.lower()
+    values = {field: pd.to_numeric(scenarios[field], errors='coerce').to_numpy(dtype=float)
+              for field in BATCH_INPUT_FIELDS if field != 'contribution_frequency'}
+    frequency_factor = np.where(frequency == 'monthly', 12, 52)
+    valid = frequency.isin(['monthly', 'weekly']).to_numpy(copy=True)
+    for field, value in values.items():
+        valid &= value >= 0
+    valid &= values['timeframe_months'] > 0
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        balance_growth = _future_value(values['current_balance'], 0.0, frequency_factor,
+                                       values['timeframe_months'], values['annual_return_rate'])
+        annuity_factor = _future_value(0.0, 1.0, frequency_factor, values['timeframe_months'],
+                                       values['annual_return_rate'])
+        required_contribution = np.maximum((values['goal_amount'] - balance_growth) / annuity_factor, 0.0)
+        future_value = balance_growth + values['contribution'] * annuity_factor
+
+    results = scenarios.copy()
+    results['required_contribution'] = np.where(valid, required_contribution, np.nan)
+    results['future_value'] = np.where(valid, future_value, np.nan)
+    return results
+
+# Function to run a scenario file through the calculator and stream the results
+# to output_path (CSV or JSONL by extension), reporting throughput as it goes
+def run_savings_batch(input_path, output_path, chunk_size=100_000, report=print):
+    start = time.perf_counter()
+    rows = 0
+    jsonl = output_path.endswith(('.jsonl', '.json'))
+    with open(output_path, 'w', newline='') as f:
+        for chunk in _read_scenarios(input_path, chunk_size):
+            missing = [field for field in BATCH_INPUT_FIELDS if field not in chunk.columns]
+            if missing:
+                raise ValueError(f"Scenario file is missing columns: {', '.join(missing)}")
+            results = evaluate_scenarios(chunk)
+            if jsonl:
+                results.to_json(f, orient='records', lines=True, double_precision=15)
+            else:
+                results.to_csv(f, header=rows == 0, index=False)
+            rows += len(results)
+            if report:
+                elapsed = time.perf_counter() - start
+                report(f"{rows} rows in {elapsed:.2f}s ({rows / max(elapsed, 1e-9):,.0f} rows/sec)")
+    return rows
 
 # Example interactive usage
 if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Savings & Investment Calculator. "
+                                                 "Interactive unless a scenario file is given.")
+    parser.add_argument('input', nargs='?', help="CSV or JSONL file of scenarios (" + ", ".join(BATCH_INPUT_FIELDS) + ")")
+    parser.add_argument('--output', default='savings_results.csv', help="CSV or JSONL results file")
+    parser.add_argument('--chunk-size', type=int, default=100_000)
+    args = parser.parse_args()
+
+    if args.input:
+        rows = run_savings_batch(args.input, args.output, args.chunk_size)
+        print(f"Wrote {rows} results to {args.output}")
+        raise SystemExit
+
     while True:
         print("\n--- Savings & Investment Calculator ---")
 
@@ -58,7 +390,7 @@ if __name__ == "__main__":
 
         # Handle the user's choice
         if option == '1':
-            required_contribution = calculate_required_contribution(current_balance, goal_amount, contribution_frequency, timeframe_months)
+            required_contribution = calculate_required_contribution(current_balance, goal_amount, contribution_frequency, timeframe_months, annual_return_rate)
             print(f"\nRequired Contribution to reach the goal: ${required_contribution:.2f} per {contribution_frequency}")
 
         elif option == '2':
@@ -0,0 +1,198 @@
+# calculations/streaming_indicators.py
+
+# Stateful indicators that update in O(1) per new bar. Seed them from history
+# with from_history(), then call update() with each new close. After the same
+# bars they match calculate_rsi, calculate_macd and calculate_volatility to
+# within 1e-8 absolute (floating-point drift of the running sums), including
+# the batch functions' handling of missing prices.
+
+import math
+from collections import deque
+
+# Running sums are rebuilt from the window this often to stop drift
+RESYNC_INTERVAL = 10_000
+
+class StreamingEMA:
+    """
+    Series.ewm(span=span, adjust=False).mean(), one value at a time.
+    """
+    def __init__(self, span):
+        self.alpha = 2.0 / (span + 1.0)
+        self.value = math.nan
+        self._old_wt = 1.0
+
+    def update(self, x):
+        is_obs = not math.isnan(x)
+        if math.isnan(self.value):
+            if is_obs:
+                self.value = x
+        else:
+            # Missing values keep decaying the weight of the old mean
+            self._old_wt *= 1.0 - self.alpha
+            if is_obs:
+                self.value = (self._old_wt * self.value + self.alpha * x) / (self._old_wt + self.alpha)
+                self._old_wt = 1.0
+        return self.value
+
+class StreamingMACD:
+    """
+    Incremental calculate_macd; update() returns (macd, signal).
+    """
+    def __init__(self, short_window=12, long_window=26, signal_window=9):
+        self.short_ema = StreamingEMA(short_window)
+        self.long_ema = StreamingEMA(long_window)
+        self.signal_ema = StreamingEMA(signal_window)
+        self.macd = math.nan
+        self.signal = math.nan
+
+    def update(self, price):
+        self.macd = self.short_ema.update(price) - self.long_ema.update(price)
+        self.signal = self.signal_ema.update(self.macd)
+        return self.macd, self.signal
+
+    @property
+    def value(self):
+        return self.macd, self.signal
+
+class StreamingRSI:
+    """
+    Incremental calculate_rsi using running gain/loss sums over the window.
+    """
+    def __init__(self, window=14):
+        self.window = window
+        self.value = math.nan
+        self._last_price = math.nan
+        self._gains = deque()
+        self._losses = deque()
+        self._gain_sum = 0.0
+        self._loss_sum = 0.0
+        self._updates = 0
+
+    def update(self, price):
+        # calculate_rsi counts a missing delta as neither gain nor loss
+        delta = price - self._last_price
+        if math.isnan(delta):
+            delta = 0.0
+        self._last_price = price
+
+        gain, loss = max(delta, 0.0), max(-delta, 0.0)
+        self._gains.append(gain)
+        self._losses.append(loss)
+        self._gain_sum += gain
+        self._loss_sum += loss
+        if len(self._gains) > self.window:
+            self._gain_sum -= self._gains.popleft()
+            self._loss_sum -= self._losses.popleft()
+
+        self._updates += 1
+        if self._updates % RESYNC_INTERVAL == 0:
+            self._gain_sum = math.fsum(self._gains)
+            self._loss_sum = math.fsum(self._losses)
+
+        if len(self._gains) < self.window:
+            self.value = math.nan
+        elif self._loss_sum <= 0.0:
+            # Same result as 100 - 100 / (1 + gain / 0) in the batch version
+            self.value = 100.0 if self._gain_sum > 0.0 else math.nan
+        else:
+            self.value = 100 - (100 / (1 + self._gain_sum / self._loss_sum))
+        return self.value
+
+class StreamingVolatility:
+    """
+    Incremental calculate_volatility: annualized rolling standard deviation of
+    daily returns, kept with Welford-style add/remove updates.
+    """
+    def __init__(self, window=14):
+        self.window = window
+        self.value = math.nan
+        self._last_price = math.nan
+        self._returns = deque()
+        self._missing = 0
+        self._count = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._updates = 0
+
+    def _add(self, x):
+        self._count += 1
+        delta = x - self._mean
+        self._mean += delta / self._count
+        self._m2 += delta * (x - self._mean)
+
+    def _remove(self, x):
+        if self._count == 1:
+            self._count, self._mean, self._m2 = 0, 0.0, 0.0
+            return
+        delta = x - self._mean
+        self._count -= 1
+        self._mean -= delta / self._count
+        self._m2 = max(self._m2 - delta * (x - self._mean), 0.0)
+
+    def _resync(self):
+        valid = [x for x in self._returns if not math.isnan(x)]
+        self._count = len(valid)
+        self._mean = math.fsum(valid) / self._count if valid else 0.0
+        self._m2 = math.fsum((x - self._mean) ** 2 for x in valid)
+
+    def update(self, price):
+        pct_change = price / self._last_price - 1 if self._last_price else math.nan
+        self._last_price = price
+
+        self._returns.append(pct_change)
+        if math.isnan(pct_change):
+            self._missing += 1
+        else:
+            self._add(pct_change)
+        if len(self._returns) > self.window:
+            dropped = self._returns.popleft()
+            if math.isnan(dropped):
+                self._missing -= 1
+            else:
+                self._remove(dropped)
+
+        self._updates += 1
+        if self._updates % RESYNC_INTERVAL == 0:
+            self._resync()
+
+        # Like Series.rolling, any missing return in the window gives no value
+        if len(self._returns) < self.window or self._missing:
+            self.value = math.nan
+        else:
+            self.value = math.sqrt(self._m2 / (self.window - 1)) * math.sqrt(252)
+        return self.value
+
+class StreamingIndicators:
+    """
+    RSI, MACD, Signal and Volatility for one ticker, updated bar by bar.
+    """
+    def __init__(self, rsi_window=14, short_window=12, long_window=26, signal_window=9, volatility_window=14):
+        self.rsi = StreamingRSI(rsi_window)
+        self.macd = StreamingMACD(short_window, long_window, signal_window)
+        self.volatility = StreamingVolatility(volatility_window)
+
+    @classmethod
+    def from_history(cls, prices, **params):
+        """
+        Build the state by replaying a history of closes (any iterable).
+        """
+        indicators = cls(**params)
+        for price in prices:
+            indicators.update(price)
+        return indicators
+
+    def update(self, price):
+        price = float(price)
+        self.rsi.update(price)
+        self.macd.update(price)
+        self.volatility.update(price)
+        return self.value
+
+    @property
+    def value(self):
+        return {
+            "RSI": self.rsi.value,
+            "MACD": self.macd.macd,
+            "Signal": self.macd.signal,
+            "Volatility": self.volatility.value
+        }
@@ -1,164 +1,269 @@
 # callbacks.py
 
-from dash.dependencies import Input, Output, State
-from dash import callback_context
+import time
+import uuid
+from dash.dependencies import ClientsideFunction, Input, Output, State
+from dash import callback_context, Patch, no_update
 import pandas as pd
 from app_instance import app
-from dash import html
+from constants import income_data, expenses_data
+from data.ledger_store import LedgerFilterError, LedgerStore, StaleLedgerDelta, parse_filter_query
 import plotly.graph_objs as go
-from utils import month_order
+from calculations.budget_calculations import monthly_totals
 from dash.exceptions import PreventUpdate
 
-# Callback to update income table
+# Authoritative ledgers per browser session; the tables only send edit deltas
+# and receive the visible page
+ledger_store = LedgerStore({'income': income_data, 'expenses': expenses_data},
+                           name_columns={'income': 'Source', 'expenses': 'Category'})
+
+# Callback to give each browser tab its own ledger session (kept across reloads)
 @app.callback(
-    Output('income-table', 'data'),
-    [Input('add-income-row', 'n_clicks'),
-     Input('income-table', 'data_timestamp'),
-     Input('clear-button', 'n_clicks')],
-    [State('income-table', 'data'),
-     State('income-table', 'columns')],
-    prevent_initial_call=True
+    Output('session-id', 'data'),
+    [Input('session-id', 'modified_timestamp')],
+    [State('session-id', 'data')]
 )
-def update_income_table(add_row_clicks, data_timestamp, clear_clicks, rows, columns):
+def assign_session_id(modified_timestamp, session_id):
+    if session_id:
+        raise PreventUpdate
+    return uuid.uuid4().hex
+
+# Clientside callbacks turning table edits into row deltas and filling in
+# Variance of the edited rows in the browser (assets/ledger.js); the server
+# still checks Variance in update_table before it is stored
+for table in ('income', 'expenses'):
+    app.clientside_callback(
+        ClientsideFunction(namespace='ledger', function_name=f'{table}TableDelta'),
+        [Output(f'{table}-delta', 'data'),
+         Output(f'{table}-table', 'data', allow_duplicate=True)],
+        [Input(f'{table}-table', 'data_timestamp')],
+        [State(f'{table}-table', 'data'),
+         State(f'{table}-table', 'data_previous')],
+        prevent_initial_call=True
+    )
+
+# Variance of a stored row, computed by the ledger store while it applies a
+# delta; rows whose amounts are not numbers get a blank Variance and are
+# collected in bad_rows by their name and month, as shown in the table
+def _variance_of(variance, name_column, bad_rows):
+    def compute(row):
+        try:
+            return variance(float(row.get('Budgeted Amount') or 0), float(row.get('Actual Amount') or 0))
+        except (TypeError, ValueError):
+            bad_rows.append(f"{row.get(name_column) or '(no name)'} ({row.get('Month') or 'no month'})")
+            return ''
+    return compute
+
+def _bad_rows_message(bad_rows):
+    if not bad_rows:
+        return ''
+    return f"{'Rows' if len(bad_rows) > 1 else 'Row'} {', '.join(bad_rows)}: amounts must be numbers"
+
+# Error text for the table: the callback's message plus, when the column
+# filters cannot be applied, a note that the rows are shown without them
+def _table_message(message, filter_error):
+    if not filter_error:
+        return message
+    return filter_error if message in (no_update, '') else f"{message}. {filter_error}"
+
+# The browser's page no longer matches the stored ledger (the session expired
+# or the edit refers to rows that are gone): show the stored ledger again
+def _reload_table(table, name_column, session_id, page_size, sort_by, filter_query, selected_names):
+    page, total = ledger_store.query(session_id, table, filter_query, sort_by, name_column, selected_names,
+                                     0, page_size)
+    message = "The table was out of date and has been reloaded; your last change was not saved."
+    return page, max(-(-total // page_size), 1), 0, message, time.time()
+
+# Shared body of the income and expenses table callbacks. The tables page,
+# sort and filter on the server: each response holds only the visible page,
+# queried from the ledger store together with the dropdown filter.
+def update_table(table, name_column, variance, session_id, delta, page_current, page_size, sort_by,
+                 filter_query, selected_names, columns):
     ctx = callback_context
-    if not ctx.triggered:
+    if not ctx.triggered or not session_id:
         raise PreventUpdate
 
     triggered_id = ctx.triggered[0]['prop_id'].split('.')[0]
+    message, version, new_page = no_update, no_update, no_update
+    pinned = ()
+
+    # Report column filters the store cannot apply instead of dropping them
+    filter_error = None
+    try:
+        parse_filter_query(filter_query)
+    except LedgerFilterError as exc:
+        filter_error, filter_query = f"{exc}. Showing rows without the column filters.", ''
+    if ctx.triggered[0]['prop_id'] == f'{table}-table.filter_query':
+        message = ''
 
     if triggered_id == 'clear-button':
         # Clear data
-        return []
-
-    elif triggered_id == 'add-income-row':
-        if rows is None:
-            rows = []
-        # Initialize new row with empty values
-        rows.append({c['id']: '' for c in columns})
-        return rows
-
-    elif triggered_id == 'income-table':
-        # Update Variance without altering cell properties
-        updated_rows = []
-        for row in rows:
-            new_row = row.copy()
-            budgeted = float(new_row.get('Budgeted Amount') or 0)
-            actual = float(new_row.get('Actual Amount') or 0)
-            new_row['Variance'] = actual - budgeted
-            updated_rows.append(new_row)
-        return updated_rows
-
-    else:
-        raise PreventUpdate
+        ledger_store.set(session_id, table, [])
+        message, version, new_page = '', time.time(), 0
+
+    elif triggered_id == f'add-{table}-row':
+        # Initialize new row with empty values and show the page holding it
+        try:
+            changed, _ = ledger_store.apply_delta(session_id, table,
+                                                  [{'op': 'insert', 'row': {c['id']: '' for c in columns}}])
+        except StaleLedgerDelta:
+            page, page_count, new_page, message, version = _reload_table(
+                table, name_column, session_id, page_size, sort_by, filter_query, selected_names)
+            return page, page_count, new_page, _table_message(message, filter_error), version
+        version = time.time()
+        # The user's filters and sort stay; the blank row is shown even if
+        # they would hide it, on whichever page it sorts to
+        pinned = changed
+        new_page = ledger_store.page_of(session_id, table, changed[0], filter_query, sort_by, name_column,
+                                        selected_names, page_size)
+        if new_page != page_current:
+            page_current = new_page
+        else:
+            new_page = no_update
+
+    elif triggered_id == f'{table}-delta':
+        bad_rows = []
+        try:
+            _, values = ledger_store.apply_delta(session_id, table, delta['ops'],
+                                                 ('Variance', _variance_of(variance, name_column, bad_rows)))
+        except StaleLedgerDelta:
+            page, page_count, new_page, message, version = _reload_table(
+                table, name_column, session_id, page_size, sort_by, filter_query, selected_names)
+            return page, page_count, new_page, _table_message(message, filter_error), version
+        message = _bad_rows_message(bad_rows)
+        version = time.time()
+        if all(operation['op'] == 'update' for operation in delta['ops']):
+            # Cell edits: the browser has already filled in Variance, so this
+            # patch only corrects cells where it disagrees with the server
+            positions = {operation['index']: operation['position'] for operation in delta['ops']}
+            patch = Patch()
+            for index, value in values.items():
+                patch[positions[index]]['Variance'] = value
+            return patch, no_update, new_page, _table_message(message, filter_error), version
+
+    # Rows were added or deleted, or the page, sort or filters changed
+    page, total = ledger_store.query(session_id, table, filter_query, sort_by, name_column, selected_names,
+                                     page_current, page_size, pinned=pinned)
+    return page, max(-(-total // page_size), 1), new_page, _table_message(message, filter_error), version
 
-# Callback to update expenses table
+# Callback to update income table
 @app.callback(
-    Output('expenses-table', 'data'),
-    [Input('add-expenses-row', 'n_clicks'),
-     Input('expenses-table', 'data_timestamp'),
-     Input('clear-button', 'n_clicks')],
-    [State('expenses-table', 'data'),
-     State('expenses-table', 'columns')],
-    prevent_initial_call=True
+    [Output('income-table', 'data'),
+     Output('income-table', 'page_count'),
+     Output('income-table', 'page_current'),
+     Output('income-table-errors', 'children'),
+     Output('income-version', 'data')],
+    [Input('session-id', 'data'),
+     Input('add-income-row', 'n_clicks'),
+     Input('income-delta', 'data'),
+     Input('clear-button', 'n_clicks'),
+     Input('income-table', 'page_current'),
+     Input('income-table', 'page_size'),
+     Input('income-table', 'sort_by'),
+     Input('income-table', 'filter_query'),
+     Input('income-source-filter', 'value')],
+    [State('income-table', 'columns')]
 )
-def update_expenses_table(add_row_clicks, data_timestamp, clear_clicks, rows, columns):
-    ctx = callback_context
-    if not ctx.triggered:
-        raise PreventUpdate
-
-    triggered_id = ctx.triggered[0]['prop_id'].split('.')[0]
+def update_income_table(session_id, add_row_clicks, delta, clear_clicks, page_current, page_size, sort_by,
+                        filter_query, selected_sources, columns):
+    return update_table('income', 'Source', lambda budgeted, actual: actual - budgeted, session_id, delta,
+                        page_current, page_size, sort_by, filter_query, selected_sources, columns)
 
-    if triggered_id == 'clear-button':
-        # Clear data
-        return []
-
-    elif triggered_id == 'add-expenses-row':
-        if rows is None:
-            rows = []
-        # Initialize new row with empty values
-        rows.append({c['id']: '' for c in columns})
-        return rows
-
-    elif triggered_id == 'expenses-table':
-        # Update Variance without altering cell properties
-        updated_rows = []
-        for row in rows:
-            new_row = row.copy()
-            budgeted = float(new_row.get('Budgeted Amount') or 0)
-            actual = float(new_row.get('Actual Amount') or 0)
-            new_row['Variance'] = budgeted - actual  # For expenses
-            updated_rows.append(new_row)
-        return updated_rows
-
-    else:
+# Callback to update expenses table
+@app.callback(
+    [Output('expenses-table', 'data'),
+     Output('expenses-table', 'page_count'),
+     Output('expenses-table', 'page_current'),
+     Output('expenses-table-errors', 'children'),
+     Output('expenses-version', 'data')],
+    [Input('session-id', 'data'),
+     Input('add-expenses-row', 'n_clicks'),
+     Input('expenses-delta', 'data'),
+     Input('clear-button', 'n_clicks'),
+     Input('expenses-table', 'page_current'),
+     Input('expenses-table', 'page_size'),
+     Input('expenses-table', 'sort_by'),
+     Input('expenses-table', 'filter_query'),
+     Input('expense-category-filter', 'value')],
+    [State('expenses-table', 'columns')]
+)
+def update_expenses_table(session_id, add_row_clicks, delta, clear_clicks, page_current, page_size, sort_by,
+                          filter_query, selected_categories, columns):
+    return update_table('expenses', 'Category', lambda budgeted, actual: budgeted - actual,  # For expenses
+                        session_id, delta, page_current, page_size, sort_by, filter_query, selected_categories,
+                        columns)
+
+# Callback to publish both ledgers' month x name rollups; the filter, chart and
+# metrics callbacks below all read this shared summary
+@app.callback(
+    Output('ledger-summary', 'data'),
+    [Input('session-id', 'data'),
+     Input('income-version', 'data'),
+     Input('expenses-version', 'data')]
+)
+def update_ledger_summary(session_id, income_version, expenses_version):
+    if not session_id:
         raise PreventUpdate
+    # Rollups are maintained by the store as edits arrive, so this does not
+    # depend on the size of the ledgers
+    return {
+        'income': ledger_store.rollup(session_id, 'income'),
+        'expenses': ledger_store.rollup(session_id, 'expenses')
+    }
 
 # Callback to update filter options
 @app.callback(
     [Output('income-source-filter', 'options'),
      Output('expense-category-filter', 'options')],
-    [Input('income-table', 'data'),
-     Input('expenses-table', 'data')]
+    [Input('ledger-summary', 'data')]
 )
-def update_filter_options(income_data, expenses_data):
-    income_df = pd.DataFrame(income_data)
-    expenses_df = pd.DataFrame(expenses_data)
+def update_filter_options(summary):
+    if summary is None:
+        raise PreventUpdate
 
-    income_sources = income_df['Source'].dropna().unique().tolist()
-    expense_categories = expenses_df['Category'].dropna().unique().tolist()
+    income_sources = summary['income']['names']
+    expense_categories = summary['expenses']['names']
 
     income_source_options = [{'label': src, 'value': src} for src in income_sources]
     expense_category_options = [{'label': cat, 'value': cat} for cat in expense_categories]
 
     return income_source_options, expense_category_options
 
-# Callback to update the main chart based on filters
-@app.callback(
-    Output('budget-vs-actual-chart', 'figure'),
-    [Input('income-table', 'data'),
-     Input('expenses-table', 'data'),
-     Input('income-source-filter', 'value'),
-     Input('expense-category-filter', 'value')]
-)
-def update_chart(income_data, expenses_data, selected_sources, selected_categories):
-    # Convert data to DataFrames
-    income_df = pd.DataFrame(income_data)
-    expenses_df = pd.DataFrame(expenses_data)
-
-    # Filter income data based on selected sources
-    if selected_sources:
-        income_df = income_df[income_df['Source'].isin(selected_sources)]
-    # Filter expenses data based on selected categories
-    if selected_categories:
-        expenses_df = expenses_df[expenses_df['Category'].isin(selected_categories)]
-
-    # Ensure 'Month' column exists
-    for df in [income_df, expenses_df]:
-        if 'Month' not in df.columns:
-            df['Month'] = ''
-
-    # Ensure numeric columns are of correct type
-    for df in [income_df, expenses_df]:
-        for col in ['Budgeted Amount', 'Actual Amount']:
-            if col in df.columns:
-                df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
-
-    # Group data by Month and sum
-    income_summary = income_df.groupby('Month')[['Budgeted Amount', 'Actual Amount']].sum().reset_index()
-    expenses_summary = expenses_df.groupby('Month')[['Budgeted Amount', 'Actual Amount']].sum().reset_index()
-
-    # Merge income and expenses data
+# Monthly income and expense sums side by side, in date order across years
+def _monthly_summary(summary, selected_sources=None, selected_categories=None):
+    income_summary = monthly_totals(summary['income'], selected_sources)
+    expenses_summary = monthly_totals(summary['expenses'], selected_categories)
+
+    # Merge income and expenses data; period codes are integers, so the outer
+    # join comes back in date order without re-sorting month names
     summary_df = pd.merge(
         income_summary,
         expenses_summary,
-        on='Month',
+        left_index=True,
+        right_index=True,
         how='outer',
         suffixes=('_Income', '_Expenses')
     ).fillna(0)
 
-    # Sort the months according to calendar order
-    summary_df['Month'] = pd.Categorical(summary_df['Month'], categories=month_order, ordered=True)
-    summary_df = summary_df.sort_values('Month')
+    # First day of each month, so charts get a real date axis
+    summary_df = summary_df.reset_index()
+    periods = summary_df.pop('Period')
+    summary_df.insert(0, 'Month', pd.to_datetime({'year': periods // 12, 'month': periods % 12 + 1, 'day': 1}))
+    return summary_df
+
+# Callback to update the main chart based on filters
+@app.callback(
+    Output('budget-vs-actual-chart', 'figure'),
+    [Input('ledger-summary', 'data'),
+     Input('income-source-filter', 'value'),
+     Input('expense-category-filter', 'value')]
+)
+def update_chart(summary, selected_sources, selected_categories):
+    if summary is None:
+        raise PreventUpdate
+
+    # Month sums of the selected sources and categories (all when none selected)
+    summary_df = _monthly_summary(summary, selected_sources, selected_categories)
 
     # Create Figure with grouped bars
     fig = go.Figure()
@@ -208,45 +313,17 @@ def update_chart(income_data, expenses_data, selected_sources, selected_categori
 # Callback to update the cumulative cash flow chart
 @app.callback(
     Output('cumulative-cash-flow-chart', 'figure'),
-    [Input('income-table', 'data'),
-     Input('expenses-table', 'data')]
+    [Input('ledger-summary', 'data')]
 )
-def update_cumulative_cash_flow_chart(income_data, expenses_data):
-    # Convert data to DataFrames
-    income_df = pd.DataFrame(income_data)
-    expenses_df = pd.DataFrame(expenses_data)
-
-    # Ensure 'Month' column exists
-    for df in [income_df, expenses_df]:
-        if 'Month' not in df.columns:
-            df['Month'] = ''
-
-    # Ensure numeric columns are of correct type
-    for df in [income_df, expenses_df]:
-        for col in ['Actual Amount']:
-            if col in df.columns:
-                df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
-
-    # Group data by Month and sum Actual Amounts
-    income_summary = income_df.groupby('Month')['Actual Amount'].sum().reset_index()
-    expenses_summary = expenses_df.groupby('Month')['Actual Amount'].sum().reset_index()
-
-    # Merge income and expenses data
-    summary_df = pd.merge(
-        income_summary,
-        expenses_summary,
-        on='Month',
-        how='outer',
-        suffixes=('_Income', '_Expenses')
-    ).fillna(0)
+def update_cumulative_cash_flow_chart(summary):
+    if summary is None:
+        raise PreventUpdate
+
+    summary_df = _monthly_summary(summary)
 
     # Calculate Net Income and Cumulative Net Income
     summary_df['Net Income'] = summary_df['Actual Amount_Income'] - summary_df['Actual Amount_Expenses']
 
-    # Sort the months according to calendar order
-    summary_df['Month'] = pd.Categorical(summary_df['Month'], categories=month_order, ordered=True)
-    summary_df = summary_df.sort_values('Month')
-
     # Calculate cumulative net income
     summary_df['Cumulative Net Income'] = summary_df['Net Income'].cumsum()
 
@@ -273,38 +350,18 @@ def update_cumulative_cash_flow_chart(income_data, expenses_data):
 
     return fig
 
-# Callback to update financial metrics
-@app.callback(
+# Financial metrics are rendered in the browser from running totals, which
+# follow each edit delta at once and are reset from the ledger summary
+app.clientside_callback(
+    ClientsideFunction(namespace='ledger', function_name='ledgerTotals'),
+    Output('ledger-totals', 'data'),
+    [Input('ledger-summary', 'data'),
+     Input('income-delta', 'data'),
+     Input('expenses-delta', 'data')],
+    [State('ledger-totals', 'data')]
+)
+app.clientside_callback(
+    ClientsideFunction(namespace='ledger', function_name='financialMetrics'),
     Output('financial-metrics', 'children'),
-    [Input('income-table', 'data'),
-     Input('expenses-table', 'data')]
+    [Input('ledger-totals', 'data')]
 )
-def update_financial_metrics(income_data, expenses_data):
-    # Convert data to DataFrames
-    income_df = pd.DataFrame(income_data)
-    expenses_df = pd.DataFrame(expenses_data)
-
-    # Ensure numeric columns are of correct type
-    for df in [income_df, expenses_df]:
-        for col in ['Actual Amount']:
-            if col in df.columns:
-                df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
-
-    total_income = income_df['Actual Amount'].sum()
-    total_expenses = expenses_df['Actual Amount'].sum()
-    net_income = total_income - total_expenses
-
-    # Calculate savings rate
-    savings_rate = (net_income / total_income) * 100 if total_income != 0 else 0
-    # Calculate expense ratio
-    expense_ratio = (total_expenses / total_income) * 100 if total_income != 0 else 0
-
-    metrics = [
-        html.P(f"Total Income: ${total_income:.2f}"),
-        html.P(f"Total Expenses: ${total_expenses:.2f}"),
-        html.P(f"Net Income: ${net_income:.2f}"),
-        html.P(f"Savings Rate: {savings_rate:.2f}%"),
-        html.P(f"Expense Ratio: {expense_ratio:.2f}%")
-    ]
-
-    return metrics
@@ -1,5 +1,6 @@
 # constants.py
 
+import os
 from utils import month_options
 from dash import dash_table
 
@@ -23,3 +24,6 @@ expenses_columns = [
 # Initialize data with a blank row
 income_data = [{'Month': '', 'Source': '', 'Budgeted Amount': '', 'Actual Amount': '', 'Variance': ''}]
 expenses_data = [{'Month': '', 'Category': '', 'Budgeted Amount': '', 'Actual Amount': '', 'Variance': ''}]
+
+# Rows per page of the income and expense tables, which page on the server
+LEDGER_PAGE_SIZE = int(os.environ.get('LEDGER_PAGE_SIZE', 50))
@@ -0,0 +1,128 @@
+# data/compact_prices.py
+
+import numpy as np
+import pandas as pd
+
+class CompactPrices:
+    """
+    Compact alternative to the (ticker, field) price frame from fetch_data.
+    Price fields live in one contiguous (fields, dates, tickers) NumPy block
+    (float32 or float64), volume in an int64 (dates, tickers) array, and
+    tickers are dictionary-encoded as column positions over a shared date index.
+
+    The accessors data[(ticker, field)], data.xs(field, axis=1, level=1),
+    data.index and data.columns behave like the frame's, so the calculation
+    and visualization functions can take either.
+    """
+    def __init__(self, dates, tickers, fields, prices, volume=None):
+        self.index = pd.DatetimeIndex(dates, name='Date')
+        self.tickers = np.asarray(tickers, dtype=object)
+        self.ticker_codes = {ticker: code for code, ticker in enumerate(self.tickers)}
+        self.fields = list(fields)
+        self._field_codes = {field: code for code, field in enumerate(self.fields)}
+        # Kept as given so memory-mapped arrays and slices stay views
+        self.prices = np.asarray(prices)
+        self.volume = volume
+
+    @classmethod
+    def from_frame(cls, data, dtype=np.float32):
+        """
+        Convert a (ticker, field) frame. Volume is stored as integers with
+        missing values as 0; every other field becomes a price block.
+        """
+        tickers = list(data.columns.get_level_values(0).unique())
+        available = list(data.columns.get_level_values(1).unique())
+        fields = [field for field in available if field != 'Volume']
+
+        prices = np.empty((len(fields), len(data.index), len(tickers)), dtype=dtype)
+        for code, field in enumerate(fields):
+            prices[code] = data.xs(field, axis=1, level=1).reindex(columns=tickers).to_numpy(dtype=dtype)
+
+        volume = None
+        if 'Volume' in available:
+            volume_frame = data.xs('Volume', axis=1, level=1).reindex(columns=tickers)
+            volume = volume_frame.fillna(0).to_numpy(dtype=np.int64)
+        return cls(data.index, tickers, fields, prices, volume)
+
+    @property
+    def columns(self):
+        fields = self.fields + (['Volume'] if self.volume is not None else [])
+        return pd.MultiIndex.from_product([list(self.tickers), fields], names=['Ticker', 'Price'])
+
+    @property
+    def nbytes(self):
+        volume_bytes = self.volume.nbytes if self.volume is not None else 0
+        return self.prices.nbytes + volume_bytes + self.index.nbytes
+
+    def field(self, field):
+        """
+        The (dates, tickers) array for one field, without copying.
+        """
+        if field == 'Volume':
+            return self.volume
+        return self.prices[self._field_codes[field]]
+
+    def xs(self, key, axis=1, level=1):
+        # Only the field cross-section used by the calculations is supported
+        if axis != 1 or level != 1:
+            raise NotImplementedError("CompactPrices.xs only selects a field: xs(field, axis=1, level=1)")
+        columns = pd.Index(self.tickers, name='Ticker')
+        return pd.DataFrame(self.field(key), index=self.index, columns=columns, copy=False)
+
+    def __getitem__(self, key):
+        if isinstance(key, tuple):
+            ticker, field = key
+            values = self.field(field)[:, self.ticker_codes[ticker]]
+            return pd.Series(values, index=self.index, name=key, copy=False)
+        # A single ticker gives its fields as a frame
+        code = self.ticker_codes[key]
+        fields = dict(zip(self.fields, self.prices[:, :, code]))
+        if self.volume is not None:
+            fields['Volume'] = self.volume[:, code]
+        return pd.DataFrame(fields, index=self.index)
+
+    def select(self, tickers=None, start_date=None, end_date=None):
+        """
+        Restrict to tickers and dates in [start_date, end_date). Date ranges and
+        runs of adjacent tickers are views; other ticker subsets are copied.
+        """
+        first = self.index.searchsorted(start_date, side='left') if start_date is not None else 0
+        last = self.index.searchsorted(end_date, side='left') if end_date is not None else len(self.index)
+        rows = slice(first, last)
+
+        columns = slice(None)
+        if tickers is not None:
+            codes = [self.ticker_codes[ticker] for ticker in tickers]
+            if codes and codes == list(range(codes[0], codes[0] + len(codes))):
+                columns = slice(codes[0], codes[0] + len(codes))
+            else:
+                columns = codes
+
+        volume = self.volume[rows, columns] if self.volume is not None else None
+        return CompactPrices(self.index[rows], self.tickers[columns], self.fields,
+                             self.prices[:, rows, columns], volume)
+
+    def with_fields(self, block):
+        """
+        Return a new CompactPrices with extra (dates, tickers) arrays added as
+        fields, e.g. the dict returned by compute_indicators.
+        """
+        new_fields = [field for field in block if field not in self._field_codes]
+        if new_fields:
+            extra = np.stack([np.asarray(block[field], dtype=self.prices.dtype) for field in new_fields])
+            prices = np.concatenate([self.prices, extra])
+        else:
+            prices = self.prices.copy()
+        for field in block:
+            if field in self._field_codes:
+                prices[self._field_codes[field]] = block[field]
+        return CompactPrices(self.index, self.tickers, self.fields + new_fields, prices, self.volume)
+
+    def to_frame(self):
+        """
+        Expand back to the (ticker, field) MultiIndex frame.
+        """
+        frames = {ticker: self[ticker] for ticker in self.tickers}
+        data = pd.concat(frames, axis=1)
+        data.columns.names = ['Ticker', 'Price']
+        return data
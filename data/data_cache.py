@@ -0,0 +1,126 @@
+# data/data_cache.py
+
+import os
+import numpy as np
+import pandas as pd
+
+# Cache location and size limit (override with environment variables)
+CACHE_DIR = os.environ.get('MARKET_DATA_CACHE_DIR', 'data/cache')
+CACHE_MAX_BYTES = int(os.environ.get('MARKET_DATA_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+
+def _cache_path(ticker):
+    # One file per ticker; keep symbols like '^GSPC' or 'BRK/B' filesystem safe
+    safe_name = ticker.upper().replace('/', '_').replace('\\', '_')
+    return os.path.join(CACHE_DIR, f"{safe_name}.npz")
+
+def _remove(path):
+    # Another worker may have evicted the same file already
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+def load_ticker(ticker):
+    """
+    Load the cached OHLCV frame for a ticker.
+    Returns (frame, (covered_start, covered_end)) or None when not cached.
+    """
+    path = _cache_path(ticker)
+    if not os.path.exists(path):
+        return None
+    try:
+        with np.load(path, allow_pickle=False) as stored:
+            index = pd.DatetimeIndex(stored['index'])
+            columns = stored['columns'].tolist()
+            frame = pd.DataFrame(stored['values'], index=index, columns=columns)
+            # Files written before dtypes and the index name were stored load as float64
+            if 'dtypes' in stored.files:
+                frame = frame.astype(dict(zip(columns, stored['dtypes'].tolist())))
+                index_name, tz = stored['index_name'].tolist()
+                if tz:
+                    frame.index = frame.index.tz_localize('UTC').tz_convert(tz)
+                frame.index.name = index_name or None
+            covered = tuple(pd.Timestamp(ts) for ts in stored['covered'].astype('datetime64[ns]'))
+    except (OSError, ValueError, KeyError, TypeError):
+        # Corrupt or partially written file; drop it and refetch
+        _remove(path)
+        return None
+
+    # Touch the file so eviction treats it as recently used
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        pass
+    return frame, covered
+
+def save_ticker(ticker, frame, covered):
+    """
+    Store a ticker's OHLCV frame and the date range [start, end) it covers.
+    """
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = _cache_path(ticker)
+    index = pd.DatetimeIndex(frame.index)
+    tz = str(index.tz) if index.tz is not None else ''
+    if index.tz is not None:
+        index = index.tz_convert('UTC').tz_localize(None)
+
+    # Write to a temporary file first so readers never see a partial file
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        np.savez(
+            f,
+            index=index.values,
+            columns=np.array([str(c) for c in frame.columns]),
+            values=frame.to_numpy(dtype='float64'),
+            # Restored on load, so cached frames match freshly downloaded ones
+            dtypes=np.array([str(dtype) for dtype in frame.dtypes]),
+            index_name=np.array([frame.index.name or '', tz]),
+            covered=np.array([np.datetime64(pd.Timestamp(ts), 'ns') for ts in covered])
+        )
+    os.replace(tmp_path, path)
+    evict_cache()
+
+def missing_ranges(covered, start, end):
+    """
+    Return the [start, end) ranges of a request that are not in the covered range.
+    The covered range is kept contiguous, so a gap between the two is also fetched.
+    """
+    if covered is None:
+        return [(start, end)]
+    covered_start, covered_end = covered
+    ranges = []
+    if start < covered_start:
+        ranges.append((start, covered_start))
+    if end > covered_end:
+        ranges.append((covered_end, end))
+    return ranges
+
+def evict_cache(max_bytes=None, directory=None, suffix='.npz'):
+    """
+    Remove least recently used cache files until the directory fits in max_bytes.
+    """
+    max_bytes = CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    directory = CACHE_DIR if directory is None else directory
+    if not os.path.isdir(directory):
+        return
+
+    entries = []
+    for name in os.listdir(directory):
+        if not name.endswith(suffix):
+            continue
+        path = os.path.join(directory, name)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+
+    total_bytes = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total_bytes <= max_bytes:
+            break
+        _remove(path)
+        total_bytes -= size
+
+def clear_cache():
+    evict_cache(max_bytes=0)
@@ -1,12 +1,171 @@
 # data_fetch.py
 
-import yfinance as yf
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
+from data import data_cache
+from data.providers import combine_frames, provider_from_env
 
-def fetch_data(symbols=["SPY", "QQQ"], start_date="2024-01-01", end_date="2024-11-08"):
-    # Fetch data
-    data = yf.download(symbols, start=start_date, end=end_date, group_by='ticker')
-    return data
+# Provider used when fetch_data is not given one (see set_provider)
+_provider = None
+
+def get_provider():
+    global _provider
+    if _provider is None:
+        _provider = provider_from_env()
+    return _provider
+
+def set_provider(provider):
+    """
+    Replace the default market data provider, e.g. with a FileProvider or
+    SyntheticProvider on machines without network access.
+    """
+    global _provider
+    _provider = provider
+
+def fetch_data(symbols=["SPY", "QQQ"], start_date="2024-01-01", end_date="2024-11-08", use_cache=True, provider=None):
+    if isinstance(symbols, str):
+        symbols = symbols.replace(',', ' ').split()
+    provider = provider or get_provider()
+    if not (use_cache and provider.use_cache):
+        return provider.download(symbols, start_date, end_date)
+
+    start = pd.Timestamp(start_date)
+    end = pd.Timestamp(end_date)
+    # Today's bar can still change, so the cache never counts it as covered
+    today = pd.Timestamp.today().normalize()
+
+    cached = {symbol: data_cache.load_ticker(symbol) for symbol in symbols}
+
+    # Group tickers missing the same date range so each range is one download
+    pending = {}
+    for symbol, entry in cached.items():
+        covered = entry[1] if entry else None
+        for date_range in data_cache.missing_ranges(covered, start, end):
+            pending.setdefault(date_range, []).append(symbol)
+
+    for (range_start, range_end), range_symbols in pending.items():
+        downloaded = provider.download(range_symbols, range_start, range_end)
+        for symbol in range_symbols:
+            covered_end = max(range_start, min(range_end, today))
+            entry = cached[symbol]
+            returned = symbol in downloaded.columns.get_level_values(0)
+            new_frame = downloaded[symbol].dropna(how='all') if returned else None
+            if new_frame is None or new_frame.empty:
+                # No bars in the range (weekend, holiday, delisted): still record it
+                # as covered so it is not downloaded again. Tickers with nothing
+                # cached yet are left alone, in case the provider just failed.
+                if entry is not None:
+                    frame, (cached_start, cached_end) = entry
+                    covered = (min(cached_start, range_start), max(cached_end, covered_end))
+                    if covered != (cached_start, cached_end):
+                        cached[symbol] = (frame, covered)
+                        data_cache.save_ticker(symbol, frame, covered)
+                continue
+
+            # Cached frames load without a freq, so downloads must not carry one either
+            new_frame.index = pd.DatetimeIndex(new_frame.index, freq=None)
+            if entry is None:
+                frame, covered = new_frame, (range_start, covered_end)
+            else:
+                # Merge the new bars into the stored series
+                frame, (cached_start, cached_end) = entry
+                frame = pd.concat([frame, new_frame])
+                frame = frame[~frame.index.duplicated(keep='last')].sort_index()
+                covered = (min(cached_start, range_start), max(cached_end, covered_end))
+
+            cached[symbol] = (frame, covered)
+            data_cache.save_ticker(symbol, frame, covered)
+
+    # Slice the requested [start, end) window for every ticker we have
+    frames = {}
+    for symbol in symbols:
+        if cached[symbol] is not None:
+            frame = cached[symbol][0]
+            frames[symbol] = frame[(frame.index >= start) & (frame.index < end)]
+    return combine_frames(frames, symbols)
+
+class RateLimiter:
+    """
+    Thread-safe limiter that spaces calls at most requests_per_second apart.
+    """
+    def __init__(self, requests_per_second):
+        self.interval = 1.0 / requests_per_second if requests_per_second else 0.0
+        self._next_time = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            wait_time = self._next_time - now
+            self._next_time = max(now, self._next_time) + self.interval
+        if wait_time > 0:
+            time.sleep(wait_time)
+
+class RateLimitedProvider:
+    """
+    Provider wrapper that waits on a RateLimiter before every download, so
+    the limit applies to provider requests, not to fetch_data calls.
+    """
+    def __init__(self, provider, limiter):
+        self.provider = provider
+        self.limiter = limiter
+        self.use_cache = provider.use_cache
+
+    def download(self, symbols, start_date, end_date):
+        self.limiter.wait()
+        return self.provider.download(symbols, start_date, end_date)
+
+def fetch_data_batch(symbols, start_date="2024-01-01", end_date="2024-11-08", chunk_size=50,
+                     max_workers=4, requests_per_second=2.0, use_cache=True, provider=None):
+    """
+    Fetch a large universe in chunks on a bounded thread pool.
+    Returns (data, failures): the (ticker, field) frame for every symbol that
+    returned bars, and a list of {'symbol', 'error'} dicts for the rest.
+    When a chunk raises, its symbols are retried one at a time, so only the
+    symbols that still fail are reported.
+    """
+    if isinstance(symbols, str):
+        symbols = symbols.replace(',', ' ').split()
+    symbols = list(dict.fromkeys(symbols))
+    provider = RateLimitedProvider(provider or get_provider(), RateLimiter(requests_per_second))
+    chunks = [symbols[i:i + chunk_size] for i in range(0, len(symbols), chunk_size)]
+
+    def fetch_symbols(part):
+        # Fully cached symbols never reach the provider, so they never wait
+        try:
+            return part, fetch_data(part, start_date, end_date, use_cache=use_cache, provider=provider), None
+        except Exception as exc:
+            return part, None, exc
+
+    def fetch_chunk(chunk):
+        result = fetch_symbols(chunk)
+        if result[2] is None or len(chunk) == 1:
+            return [result]
+        # Retry the chunk one symbol at a time, through the same rate limiter,
+        # so a single bad symbol does not fail the rest
+        return [fetch_symbols([symbol]) for symbol in chunk]
+
+    frames = {}
+    failures = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(fetch_chunk, chunk) for chunk in chunks]
+        for future in futures:
+            for part, data, error in future.result():
+                if error is not None:
+                    failures.extend({'symbol': symbol, 'error': repr(error)} for symbol in part)
+                    continue
+
+                returned = set(data.columns.get_level_values(0))
+                for symbol in part:
+                    frame = data[symbol].dropna(how='all') if symbol in returned else None
+                    if frame is None or frame.empty:
+                        failures.append({'symbol': symbol, 'error': 'no data returned'})
+                    else:
+                        frames[symbol] = data[symbol]
+
+    return combine_frames(frames, symbols), failures
 
 # If you want to allow import to work seamlessly, add the following line
-__all__ = ["fetch_data"]
+__all__ = ["fetch_data", "fetch_data_batch", "get_provider", "set_provider"]
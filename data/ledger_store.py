@@ -0,0 +1,538 @@
+# data/ledger_store.py
+
+import contextlib
+import copy
+import datetime
+import json
+import math
+import os
+import re
+import threading
+import zlib
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from data.data_cache import evict_cache
+from utils import normalize_month, period_code
+
+try:
+    import fcntl
+except ImportError:  # Windows: no locking between processes
+    fcntl = None
+
+# Every change is written through to LEDGER_STORE_DIR, one JSON file per
+# session, so any worker process can load any session; set it to '' to keep
+# sessions in memory only (single worker). Each process keeps the
+# LEDGER_STORE_MAX_SESSIONS most recently used sessions in memory.
+LEDGER_STORE_MAX_SESSIONS = int(os.environ.get('LEDGER_STORE_MAX_SESSIONS', 256))
+LEDGER_STORE_DIR = os.environ.get('LEDGER_STORE_DIR', 'data/ledger_sessions')
+LEDGER_STORE_DISK_MAX_BYTES = int(os.environ.get('LEDGER_STORE_DISK_MAX_BYTES', 512 * 1024 * 1024))
+# Lock files serializing changes to sessions across processes
+_LOCK_STRIPES = 64
+
+_SESSION_ID = re.compile(r'^[0-9a-f]{32}$')
+
+# Columns compared and sorted as numbers in ledger queries
+NUMERIC_COLUMNS = ('Budgeted Amount', 'Actual Amount', 'Variance')
+# Columns holding months, compared and sorted by date through their period codes
+PERIOD_COLUMNS = ('Month',)
+
+# DataTable filter_query operators: relational ones (all but datestartswith
+# may carry an i/s prefix for case-insensitive/sensitive matching; plain ones
+# are case-sensitive, as in DataTable) and unary 'is ...' tests
+_RELATIONAL_OPERATORS = {'eq': 'eq', '=': 'eq', 'ne': 'ne', '!=': 'ne', 'lt': 'lt', '<': 'lt', 'le': 'le',
+                         '<=': 'le', 'gt': 'gt', '>': 'gt', 'ge': 'ge', '>=': 'ge', 'contains': 'contains'}
+_RELATIONAL = re.compile(r'^(?:(?P<case>[is])?(?P<op>contains|eq|ne|lt|le|gt|ge)(?=\s|$)'
+                         r'|(?P<symbol_case>[is])?(?P<symbol>>=|<=|!=|=|<|>)'
+                         r'|(?P<date>datestartswith)(?=\s|$))\s*(?P<value>.*)$', re.IGNORECASE | re.DOTALL)
+_UNARY = re.compile(r'^is\s+(blank|bool|even|nil|num|object|odd|prime|str)$', re.IGNORECASE)
+# '&&' / 'and' (or '||' / 'or') outside double quotes
+_CONJUNCTION = re.compile(r'\s+(?:&&|and)\s+(?=(?:[^"]*"[^"]*")*[^"]*$)', re.IGNORECASE)
+_DISJUNCTION = re.compile(r'(?:\|\||\s+or\s+)(?=(?:[^"]*"[^"]*")*[^"]*$)', re.IGNORECASE)
+
+class LedgerFilterError(ValueError):
+    """
+    A filter_query the ledger cannot apply (e.g. 'or', '!' or parentheses).
+    """
+
+def parse_filter_query(filter_query):
+    """
+    Split a DataTable filter_query such as '{Source} icontains "Job" && {Actual Amount} > 100'
+    into (column, operator, value, case_sensitive) terms; operator is eq, ne,
+    lt, le, gt, ge, contains, datestartswith or a unary test like 'is blank'
+    (value None). Raises LedgerFilterError for anything else.
+    """
+    terms = []
+    filter_query = (filter_query or '').strip()
+    if not filter_query:
+        return terms
+    if _DISJUNCTION.search(filter_query):
+        raise LedgerFilterError(f"Filters combined with 'or' are not supported: {filter_query}")
+    for part in _CONJUNCTION.split(filter_query):
+        part = part.strip()
+        match = re.match(r'^\{(.+?)\}\s*(.*)$', part, re.DOTALL)
+        unary = _UNARY.match(match.group(2).strip()) if match else None
+        relational = _RELATIONAL.match(match.group(2).strip()) if match and not unary else None
+        if unary:
+            terms.append((match.group(1), f"is {unary.group(1).lower()}", None, True))
+            continue
+        if not relational:
+            raise LedgerFilterError(f"Filter not understood: {part}")
+        if relational.group('date'):
+            operator, case = 'datestartswith', None
+        elif relational.group('op'):
+            operator, case = _RELATIONAL_OPERATORS[relational.group('op').lower()], relational.group('case')
+        else:
+            operator, case = _RELATIONAL_OPERATORS[relational.group('symbol')], relational.group('symbol_case')
+        value = relational.group('value').strip()
+        if len(value) >= 2 and value[0] == value[-1] and value[0] in ('"', "'", '`'):
+            value = value[1:-1].replace('\\' + value[0], value[0])
+        terms.append((match.group(1), operator, value, (case or 's').lower() == 's'))
+    return terms
+
+def _is_number(value):
+    return isinstance(value, (int, float, np.integer, np.floating)) and not isinstance(value, (bool, np.bool_))
+
+def _is_prime(value):
+    if not _is_number(value) or value != int(value) or value < 2:
+        return False
+    value = int(value)
+    return all(value % divisor for divisor in range(2, math.isqrt(value) + 1))
+
+# DataTable's unary tests on raw cell values
+_UNARY_TESTS = {
+    'is blank': lambda value: value is None or (isinstance(value, str) and not value.strip())
+                              or (isinstance(value, float) and math.isnan(value)),
+    'is nil': lambda value: value is None or (isinstance(value, float) and math.isnan(value)),
+    'is bool': lambda value: isinstance(value, (bool, np.bool_)),
+    'is num': _is_number,
+    'is str': lambda value: isinstance(value, str),
+    'is object': lambda value: isinstance(value, (dict, list)),
+    'is even': lambda value: _is_number(value) and value % 2 == 0,
+    'is odd': lambda value: _is_number(value) and value % 2 == 1,
+    'is prime': _is_prime,
+}
+
+class _LedgerIndex:
+    # Columnar copy of one stored table for queries, with sort orders cached
+    # per sort_by; rebuilt only after the table changes. Month columns become
+    # period codes plus their sorted order, so date ranges are binary searches.
+    def __init__(self, rows, numeric_columns, period_columns=PERIOD_COLUMNS):
+        self.frame = pd.DataFrame(rows)
+        self.numbers = {col: pd.to_numeric(self.frame[col], errors='coerce').to_numpy(dtype=float)
+                        for col in numeric_columns if col in self.frame.columns}
+        self.periods = {}
+        for col in period_columns:
+            if col in self.frame.columns:
+                codes = {value: period_code(value) for value in self.frame[col].unique()}
+                values = self.frame[col].map(codes).to_numpy(dtype=float, na_value=np.nan)
+                self.numbers[col] = values
+                order = np.argsort(values, kind='stable')
+                self.periods[col] = (order, values[order])
+        self.text = {}
+        self.orders = {}
+
+    def _period_mask(self, column, operator, code):
+        # Rows whose period compares to code, from two binary searches
+        order, sorted_codes = self.periods[column]
+        first = np.searchsorted(sorted_codes, code, side='left')
+        last = np.searchsorted(sorted_codes, code, side='right')
+        dated = np.searchsorted(sorted_codes, np.inf, side='left')
+        selected = {'eq': slice(first, last), 'lt': slice(0, first), 'le': slice(0, last),
+                    'gt': slice(last, dated), 'ge': slice(first, dated)}
+        mask = np.zeros(len(order), dtype=bool)
+        if operator == 'ne':
+            mask[order[:dated]] = True
+            mask[order[first:last]] = False
+        else:
+            mask[order[selected[operator]]] = True
+        return mask
+
+    def _text(self, column):
+        if column not in self.text:
+            values = self.frame[column] if column in self.frame.columns else pd.Series('', index=self.frame.index)
+            self.text[column] = values.fillna('').astype(str)
+        return self.text[column]
+
+    def mask(self, terms, name_column=None, names=None):
+        mask = np.ones(len(self.frame), dtype=bool)
+        if names:
+            mask &= self._text(name_column).isin([str(name) for name in names]).to_numpy()
+        for column, operator, value, case_sensitive in terms:
+            if operator in _UNARY_TESTS:
+                raw = self.frame[column] if column in self.frame.columns else pd.Series(None, index=self.frame.index)
+                mask &= np.fromiter((_UNARY_TESTS[operator](item) for item in raw.to_numpy(dtype=object)),
+                                    dtype=bool, count=len(raw))
+                continue
+            if operator in ('contains', 'datestartswith'):
+                text = self._text(column)
+                if operator == 'contains':
+                    mask &= text.str.contains(value, case=case_sensitive, regex=False).to_numpy()
+                else:
+                    mask &= text.str.startswith(value).to_numpy()
+                continue
+            if column in self.periods and period_code(value) is not None:
+                mask &= self._period_mask(column, operator, period_code(value))
+                continue
+            try:
+                number = float(value)
+            except ValueError:
+                number = None
+            if column in self.numbers and number is not None:
+                values = self.numbers[column]
+            elif case_sensitive:
+                values, number = self._text(column).to_numpy(), value
+            else:
+                values, number = self._text(column).str.lower().to_numpy(), value.lower()
+            with np.errstate(invalid='ignore'):
+                mask &= {'eq': lambda: values == number, 'ne': lambda: values != number,
+                         'lt': lambda: values < number, 'le': lambda: values <= number,
+                         'gt': lambda: values > number, 'ge': lambda: values >= number}[operator]()
+        return mask
+
+    def order(self, sort_by):
+        # Row positions in sort order; missing numbers sort last either way
+        key = tuple((item['column_id'], item['direction']) for item in sort_by)
+        if key not in self.orders:
+            order = np.arange(len(self.frame))
+            for column, direction in reversed(key):
+                if column in self.numbers:
+                    values = self.numbers[column][order]
+                    ranks = np.where(np.isnan(values), np.inf, -values if direction == 'desc' else values)
+                    order = order[np.argsort(ranks, kind='stable')]
+                else:
+                    codes = np.unique(self._text(column).to_numpy()[order], return_inverse=True)[1]
+                    order = order[np.argsort(-codes if direction == 'desc' else codes, kind='stable')]
+            self.orders[key] = order
+        return self.orders[key]
+
+class StaleLedgerDelta(ValueError):
+    """
+    A delta from the browser that no longer matches the stored ledger: its
+    session is unknown (expired, or held by another worker process) or it
+    refers to rows that do not exist. Nothing from the delta was applied.
+    """
+
+def _check_operations(rows, operations):
+    # Validate a whole delta before applying any of it, tracking the table
+    # length through inserts and deletes
+    length = len(rows)
+    for operation in operations:
+        op = operation.get('op')
+        index = operation.get('index')
+        if op == 'replace':
+            length = len(operation['rows'])
+            continue
+        if op not in ('update', 'insert', 'delete'):
+            raise ValueError(f"Unknown ledger operation: {op!r}")
+        if op == 'insert' and index is None:
+            length += 1
+            continue
+        upper = length + 1 if op == 'insert' else length
+        if not isinstance(index, int) or isinstance(index, bool) or not 0 <= index < upper:
+            raise StaleLedgerDelta(f"Ledger row {index!r} does not exist")
+        length += {'insert': 1, 'delete': -1}.get(op, 0)
+
+def _stored_row(row, year):
+    # Month as 'YYYY-MM'; a bare month name from an older ledger falls in year
+    month = row.get('Month')
+    stored = normalize_month(month, year)
+    return row if stored == month else dict(row, Month=stored)
+
+def _stored_rows(rows):
+    year = datetime.date.today().year
+    return [_stored_row(row, year) for row in rows]
+
+def _amount(value):
+    # Amounts as the budget calculations read them: non-numbers count as 0
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return 0.0
+    return 0.0 if math.isnan(number) else number
+
+class LedgerRollup:
+    """
+    Budgeted and actual sums and row counts per (period, name) for one ledger
+    table, kept current by adding and removing rows, so an edit costs
+    O(1) instead of a regroup of the whole ledger. to_dict() gives JSON-friendly
+    columns (Period, Name, amounts, Count) sorted by period, plus the names
+    in first-seen order.
+    """
+    def __init__(self, name_column, rows=()):
+        self.name_column = name_column
+        # (period code, name) -> [budgeted, actual, count], in first-seen order
+        self.groups = {}
+        for row in rows:
+            self.add(row)
+
+    def add(self, row, sign=1):
+        key = (period_code(row.get('Month')), row.get(self.name_column))
+        group = self.groups.setdefault(key, [0.0, 0.0, 0])
+        group[0] += sign * _amount(row.get('Budgeted Amount'))
+        group[1] += sign * _amount(row.get('Actual Amount'))
+        group[2] += sign
+        if group[2] == 0:
+            del self.groups[key]
+
+    def remove(self, row):
+        self.add(row, sign=-1)
+
+    def to_dict(self):
+        # Sorted by period, undated rows last; O(groups log groups)
+        keys = sorted(self.groups, key=lambda key: (key[0] is None, key[0] or 0))
+        values = [self.groups[key] for key in keys]
+        return {
+            'Period': [code for code, _ in keys],
+            'Name': [name for _, name in keys],
+            'Budgeted Amount': [group[0] for group in values],
+            'Actual Amount': [group[1] for group in values],
+            'Count': [group[2] for group in values],
+            'names': list(dict.fromkeys(name for _, name in self.groups if name is not None))
+        }
+
+class LedgerStore:
+    """
+    Authoritative income and expense ledgers per browser session, so callbacks
+    receive small edit deltas instead of whole tables. Each session holds one
+    list of row dicts per table, seeded from initial_rows on first access.
+    Tables listed in name_columns ({table: 'Source'}) also get a LedgerRollup,
+    maintained through every change.
+    With disk_dir set, the session files there are authoritative: every change
+    is written through under a cross-process lock, and a worker reloads its
+    in-memory copy whenever another worker has written a newer one. Without
+    it, sessions live in one process, and those evicted from memory expire.
+    """
+    def __init__(self, initial_rows, name_columns=None, max_sessions=LEDGER_STORE_MAX_SESSIONS,
+                 disk_dir=LEDGER_STORE_DIR, disk_max_bytes=LEDGER_STORE_DISK_MAX_BYTES):
+        self.initial_rows = initial_rows
+        self.name_columns = name_columns or {}
+        self.max_sessions = max_sessions
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self._sessions = OrderedDict()
+        # session id -> stat of the session file the in-memory copy matches
+        self._stamps = {}
+        self._indexes = {}
+        self._rollups = {}
+        self._lock = threading.RLock()
+
+    def _disk_path(self, session_id):
+        return os.path.join(self.disk_dir, f"{session_id}.json")
+
+    def _disk_stamp(self, session_id):
+        # Changes whenever the file is replaced, by this or another process
+        try:
+            stat = os.stat(self._disk_path(session_id))
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+    @contextlib.contextmanager
+    def _locked(self, session_id):
+        # The in-process lock, plus an exclusive lock on the session's lock
+        # file so workers read and write each session one at a time
+        if not _SESSION_ID.match(session_id or ''):
+            raise ValueError(f"Invalid ledger session id: {session_id!r}")
+        with self._lock:
+            if not self.disk_dir or fcntl is None:
+                yield
+                return
+            os.makedirs(self.disk_dir, exist_ok=True)
+            stripe = zlib.crc32(session_id.encode()) % _LOCK_STRIPES
+            with open(os.path.join(self.disk_dir, f"sessions-{stripe}.lock"), 'a') as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _session(self, session_id, create=True):
+        # Called under _locked. Unknown sessions are seeded from initial_rows,
+        # or raise StaleLedgerDelta when create is False
+        stamp = self._disk_stamp(session_id) if self.disk_dir else None
+        if session_id in self._sessions:
+            if not self.disk_dir or stamp == self._stamps.get(session_id):
+                self._sessions.move_to_end(session_id)
+                return self._sessions[session_id]
+            if stamp is None:
+                # The disk tier evicted the file; this copy is still current
+                self._sessions.move_to_end(session_id)
+                self._save(session_id)
+                return self._sessions[session_id]
+            # Another worker has written a newer copy
+            self._forget(session_id)
+
+        if stamp is not None:
+            with open(self._disk_path(session_id)) as f:
+                session = {table: _stored_rows(rows) for table, rows in json.load(f).items()}
+            self._stamps[session_id] = stamp
+        elif create:
+            session = {table: _stored_rows(rows) for table, rows in copy.deepcopy(self.initial_rows).items()}
+        else:
+            raise StaleLedgerDelta(f"Ledger session {session_id} has expired")
+        self._sessions[session_id] = session
+        if stamp is None and self.disk_dir:
+            self._save(session_id)
+        self._evict()
+        return session
+
+    def _save(self, session_id):
+        # Write a changed session through to disk
+        if not self.disk_dir:
+            return
+        tmp_path = f"{self._disk_path(session_id)}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self._sessions[session_id], f)
+        os.replace(tmp_path, self._disk_path(session_id))
+        self._stamps[session_id] = self._disk_stamp(session_id)
+        evict_cache(self.disk_max_bytes, directory=self.disk_dir, suffix='.json')
+
+    def _forget(self, session_id):
+        self._sessions.pop(session_id, None)
+        self._stamps.pop(session_id, None)
+        self._drop_indexes(session_id, rollups=True)
+
+    def _evict(self):
+        # Least recently used sessions leave memory; with a disk tier they are
+        # already on disk, without one they expire
+        while len(self._sessions) > self.max_sessions:
+            self._forget(next(iter(self._sessions)))
+
+    def _drop_indexes(self, session_id, table=None, rollups=False):
+        # Query indexes go stale on any change; rollups only when rebuilt wholesale
+        for cache in (self._indexes, self._rollups) if rollups else (self._indexes,):
+            for key in [key for key in cache if key[0] == session_id and table in (None, key[1])]:
+                del cache[key]
+
+    def _rollup(self, session_id, table):
+        # Existing rollup of a table, or None if it has not been built yet
+        return self._rollups.get((session_id, table))
+
+    def set(self, session_id, table, rows):
+        with self._locked(session_id):
+            self._session(session_id)[table] = _stored_rows(rows)
+            self._drop_indexes(session_id, table, rollups=True)
+            self._save(session_id)
+
+    def apply_delta(self, session_id, table, operations, derived=None):
+        """
+        Apply edit operations from the browser, in order:
+        {'op': 'update', 'index': i, 'row': {...}}, {'op': 'insert', 'index': i, 'row': {...}},
+        {'op': 'delete', 'index': i} and {'op': 'replace', 'rows': [...]}.
+        An insert without an index appends. derived, a (column, compute) pair,
+        then sets column to compute(row) on every updated or inserted row, in
+        the same locked step. Returns (indices of updated or inserted rows,
+        {index: value} for derived cells that changed). The delta is applied
+        whole or not at all: StaleLedgerDelta is raised, with nothing changed,
+        when the session is unknown or an index is out of range.
+        """
+        with self._locked(session_id):
+            rows = self._session(session_id, create=False)[table]
+            _check_operations(rows, operations)
+            rollup = self._rollup(session_id, table)
+            self._drop_indexes(session_id, table)
+            changed = []
+            year = datetime.date.today().year
+            for operation in operations:
+                op = operation.get('op')
+                if 'row' in operation:
+                    operation = dict(operation, row=_stored_row(operation['row'], year))
+                if op == 'update':
+                    if rollup is not None:
+                        rollup.remove(rows[operation['index']])
+                        rollup.add(operation['row'])
+                    rows[operation['index']] = operation['row']
+                    changed.append(operation['index'])
+                elif op == 'insert':
+                    index = len(rows) if operation.get('index') is None else operation['index']
+                    rows.insert(index, operation['row'])
+                    if rollup is not None:
+                        rollup.add(operation['row'])
+                    changed.append(index)
+                elif op == 'delete':
+                    if rollup is not None:
+                        rollup.remove(rows[operation['index']])
+                    del rows[operation['index']]
+                elif op == 'replace':
+                    rows[:] = [_stored_row(row, year) for row in operation['rows']]
+                    self._drop_indexes(session_id, table, rollups=True)
+                    rollup = None
+                    changed = list(range(len(rows)))
+            changed = sorted(set(changed))
+
+            values = {}
+            if derived is not None:
+                column, compute = derived
+                for index in changed:
+                    value = compute(rows[index])
+                    if rows[index].get(column) != value:
+                        values[index] = value
+                        if rollup is not None:
+                            rollup.remove(rows[index])
+                        rows[index] = dict(rows[index], **{column: value})
+                        if rollup is not None:
+                            rollup.add(rows[index])
+            self._save(session_id)
+            return changed, values
+
+    def rollup(self, session_id, table):
+        """
+        Snapshot (LedgerRollup.to_dict) of the table's month x name rollup,
+        built on first use and maintained incrementally afterwards.
+        """
+        with self._locked(session_id):
+            rows = self._session(session_id)[table]
+            key = (session_id, table)
+            if key not in self._rollups:
+                self._rollups[key] = LedgerRollup(self.name_columns[table], rows)
+            return self._rollups[key].to_dict()
+
+    def _positions(self, session_id, table, filter_query, sort_by, name_column, names, numeric_columns,
+                   pinned):
+        # Ledger positions of the matching (or pinned) rows in sort order;
+        # called under _locked
+        rows = self._session(session_id)[table]
+        key = (session_id, table)
+        if key not in self._indexes:
+            self._indexes[key] = _LedgerIndex(rows, numeric_columns)
+        index = self._indexes[key]
+        mask = index.mask(parse_filter_query(filter_query), name_column, names)
+        mask[np.array([i for i in pinned if 0 <= i < len(rows)], dtype=int)] = True
+        positions = index.order(sort_by) if sort_by else np.arange(len(rows))
+        return rows, positions[mask[positions]]
+
+    def query(self, session_id, table, filter_query='', sort_by=None, name_column=None, names=None,
+              page_current=0, page_size=100, numeric_columns=NUMERIC_COLUMNS, pinned=()):
+        """
+        One page of a stored table for a DataTable with custom paging, sorting
+        and filtering: rows matching filter_query and, when names are given,
+        whose name_column is one of them, ordered by sort_by. Rows whose ledger
+        positions are in pinned are included even if they do not match. Each
+        returned row carries its ledger position as 'id'.
+        Returns (page rows, matching count).
+        """
+        with self._locked(session_id):
+            rows, positions = self._positions(session_id, table, filter_query, sort_by, name_column, names,
+                                              numeric_columns, pinned)
+            first = page_current * page_size
+            return [dict(rows[i], id=int(i)) for i in positions[first:first + page_size]], len(positions)
+
+    def page_of(self, session_id, table, row, filter_query='', sort_by=None, name_column=None, names=None,
+                page_size=100, numeric_columns=NUMERIC_COLUMNS):
+        """
+        The page on which query(..., pinned=[row]) shows the row at ledger position row.
+        """
+        with self._locked(session_id):
+            _, positions = self._positions(session_id, table, filter_query, sort_by, name_column, names,
+                                           numeric_columns, [row])
+            return int(np.flatnonzero(positions == row)[0]) // page_size
+
+    def clear(self, session_id):
+        with self._locked(session_id):
+            self._forget(session_id)
+            if self.disk_dir:
+                try:
+                    os.remove(self._disk_path(session_id))
+                except FileNotFoundError:
+                    pass
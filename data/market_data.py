@@ -0,0 +1,144 @@
+# data/market_data.py
+
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from data.compact_prices import CompactPrices
+from data.data_fetch import fetch_data
+from data.price_store import PRICE_STORE_DIR, current_version, open_price_store, price_store_coverage
+
+# Frames and derived results each kept per context (override with an environment variable)
+MARKET_DATA_CONTEXT_MAX_ENTRIES = int(os.environ.get('MARKET_DATA_CONTEXT_MAX_ENTRIES', 32))
+
+class MarketDataContext:
+    """
+    Lazily fetched, shared market data for the investment calculations and charts.
+    Nothing is downloaded until the first get(); each (symbols, start, end)
+    is fetched once and reused, along with anything derived from it.
+    With compact=True the data is held as CompactPrices instead of a DataFrame.
+    With store_dir set, data comes from the memory-mapped price store written
+    by data/price_store.py whenever it holds every requested symbol over the
+    requested dates. Frames and derived results are each kept in an LRU of
+    max_entries entries.
+    """
+    def __init__(self, symbols=("SPY", "QQQ"), start_date="2024-01-01", end_date="2024-11-08", provider=None,
+                 compact=False, compact_dtype=np.float32, store_dir=None,
+                 max_entries=MARKET_DATA_CONTEXT_MAX_ENTRIES):
+        self.symbols = tuple(symbols)
+        self.start_date = start_date
+        self.end_date = end_date
+        self.provider = provider
+        self.compact = compact
+        self.compact_dtype = compact_dtype
+        self.store_dir = store_dir
+        self.max_entries = max_entries
+        self._store = None
+        self._store_version = None
+        self._store_covered = None
+        self._frames = OrderedDict()
+        self._derived = OrderedDict()
+        self._key_locks = {}
+        self._lock = threading.Lock()
+
+    def _key(self, symbols, start_date, end_date):
+        symbols = self.symbols if symbols is None else tuple(symbols)
+        return (symbols, start_date or self.start_date, end_date or self.end_date)
+
+    def get(self, symbols=None, start_date=None, end_date=None):
+        """
+        Return the (ticker, field) price frame, fetching it on first access.
+        The frame is shared; copy it before adding columns.
+        """
+        key = self._key(symbols, start_date, end_date)
+        self._check_store()
+        with self._lock:
+            if key in self._frames:
+                return self._recall(self._frames, key)
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+            store, store_covered = self._store, self._store_covered
+
+        # Only callers of the same key wait on a download; others go ahead
+        with key_lock:
+            with self._lock:
+                if key in self._frames:
+                    return self._recall(self._frames, key)
+            if self._store_serves(store, store_covered, key):
+                data = store.select(key[0], key[1], key[2])
+            else:
+                data = fetch_data(list(key[0]), key[1], key[2], provider=self.provider)
+                if self.compact:
+                    data = CompactPrices.from_frame(data, dtype=self.compact_dtype)
+            with self._lock:
+                self._key_locks.pop(key, None)
+                return self._remember(self._frames, key, data)
+
+    # Both helpers expect self._lock to be held
+    @staticmethod
+    def _recall(entries, key):
+        entries.move_to_end(key)
+        return entries[key]
+
+    def _remember(self, entries, key, value):
+        value = entries.setdefault(key, value)
+        entries.move_to_end(key)
+        while len(entries) > self.max_entries:
+            entries.popitem(last=False)
+        return value
+
+    @staticmethod
+    def _store_serves(store, covered, key):
+        # The store must hold every symbol over the whole [start, end) window
+        if store is None or not all(symbol in store.ticker_codes for symbol in key[0]):
+            return False
+        if covered is None:
+            # Versions written without a range: trust the bars it holds
+            if not len(store.index):
+                return False
+            covered = (store.index[0], store.index[-1] + pd.Timedelta(days=1))
+        return covered[0] <= pd.Timestamp(key[1]) and pd.Timestamp(key[2]) <= covered[1]
+
+    def _check_store(self):
+        # Remap when the refresher has published a new version
+        if not self.store_dir:
+            return
+        version = current_version(self.store_dir)
+        if version != self._store_version:
+            store = open_price_store(self.store_dir, version)
+            covered = price_store_coverage(self.store_dir, version) if store is not None else None
+            with self._lock:
+                self._store, self._store_version, self._store_covered = store, version, covered
+                self._frames.clear()
+                self._derived.clear()
+
+    @property
+    def data(self):
+        return self.get()
+
+    def derived(self, name, compute, symbols=None, start_date=None, end_date=None):
+        """
+        Memoize compute(frame) under name for the given (symbols, start, end).
+        Results are dropped when the price store publishes a new version.
+        """
+        key = (name,) + self._key(symbols, start_date, end_date)
+        self._check_store()
+        with self._lock:
+            if key in self._derived:
+                return self._recall(self._derived, key)
+            version = self._store_version
+        result = compute(self.get(*key[1:]))
+        with self._lock:
+            # Keep results computed from a version that was replaced meanwhile out of the cache
+            if version != self._store_version:
+                return result
+            return self._remember(self._derived, key, result)
+
+    def clear(self):
+        with self._lock:
+            self._frames.clear()
+            self._derived.clear()
+
+# Shared context used when callers do not pass their own; set PRICE_STORE_DIR
+# to have the dashboard workers read the shared price store
+default_context = MarketDataContext(store_dir=PRICE_STORE_DIR if 'PRICE_STORE_DIR' in os.environ else None)
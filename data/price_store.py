@@ -0,0 +1,128 @@
+# data/price_store.py
+
+import json
+import os
+import shutil
+import time
+import numpy as np
+import pandas as pd
+from data.compact_prices import CompactPrices
+
+# Directory shared by the refresher and the dashboard workers
+PRICE_STORE_DIR = os.environ.get('PRICE_STORE_DIR', 'data/price_store')
+CURRENT_FILE = 'CURRENT'
+# Older versions kept so readers that still map them are not disturbed
+KEEP_VERSIONS = 2
+
+def allocate_price_store(dates, tickers, fields, directory=PRICE_STORE_DIR, dtype=np.float32, covered=None):
+    """
+    Create a new, unpublished store version whose prices.npy is a writable
+    (fields, dates, tickers) memory map, for writers that fill it in place
+    (possibly from several processes). covered is the [start, end) date
+    range the data was fetched for. Returns (version, prices).
+    """
+    version = f"v{time.time_ns()}"
+    version_dir = os.path.join(directory, version)
+    os.makedirs(version_dir)
+    np.save(os.path.join(version_dir, 'dates.npy'), np.asarray(dates, dtype='datetime64[ns]'))
+    meta = {'tickers': [str(t) for t in tickers], 'fields': list(fields)}
+    if covered is not None:
+        meta['covered'] = [str(pd.Timestamp(ts).date()) for ts in covered]
+    with open(os.path.join(version_dir, 'meta.json'), 'w') as f:
+        json.dump(meta, f)
+    prices = np.lib.format.open_memmap(
+        os.path.join(version_dir, 'prices.npy'), mode='w+', dtype=dtype,
+        shape=(len(fields), len(dates), len(tickers))
+    )
+    return version, prices
+
+def publish_price_store(version, directory=PRICE_STORE_DIR):
+    """
+    Point CURRENT at a fully written version, atomically.
+    """
+    tmp_path = os.path.join(directory, f"{CURRENT_FILE}.{os.getpid()}.tmp")
+    with open(tmp_path, 'w') as f:
+        f.write(version)
+    os.replace(tmp_path, os.path.join(directory, CURRENT_FILE))
+    _remove_old_versions(directory)
+
+def write_price_store(data, directory=PRICE_STORE_DIR, covered=None):
+    """
+    Write a (ticker, field) frame or CompactPrices as a new store version of
+    .npy files, then switch the CURRENT pointer to it atomically.
+    covered is the [start, end) range the data was fetched for.
+    Returns the version name.
+    """
+    if not isinstance(data, CompactPrices):
+        data = CompactPrices.from_frame(data)
+
+    version, prices = allocate_price_store(data.index.values, data.tickers, data.fields, directory,
+                                           dtype=data.prices.dtype, covered=covered)
+    prices[:] = data.prices
+    prices.flush()
+    if data.volume is not None:
+        np.save(os.path.join(directory, version, 'volume.npy'), data.volume)
+
+    publish_price_store(version, directory)
+    return version
+
+def _remove_old_versions(directory):
+    versions = sorted(name for name in os.listdir(directory) if name.startswith('v'))
+    for name in versions[:-KEEP_VERSIONS]:
+        shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+
+def current_version(directory=PRICE_STORE_DIR):
+    try:
+        with open(os.path.join(directory, CURRENT_FILE)) as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        return None
+
+def open_price_store(directory=PRICE_STORE_DIR, version=None):
+    """
+    Map the current (or given) store version read-only. The arrays are
+    memory-mapped, so every worker shares the same pages and nothing is
+    copied or fetched. Returns CompactPrices, or None if no version exists.
+    """
+    version = version or current_version(directory)
+    if version is None:
+        return None
+    version_dir = os.path.join(directory, version)
+    with open(os.path.join(version_dir, 'meta.json')) as f:
+        meta = json.load(f)
+
+    dates = np.load(os.path.join(version_dir, 'dates.npy'))
+    prices = np.load(os.path.join(version_dir, 'prices.npy'), mmap_mode='r')
+    volume_path = os.path.join(version_dir, 'volume.npy')
+    volume = np.load(volume_path, mmap_mode='r') if os.path.exists(volume_path) else None
+    return CompactPrices(dates, meta['tickers'], meta['fields'], prices, volume)
+
+def price_store_coverage(directory=PRICE_STORE_DIR, version=None):
+    """
+    The [start, end) date range a store version was fetched for, or None for
+    versions written without one (or no version at all).
+    """
+    version = version or current_version(directory)
+    if version is None:
+        return None
+    with open(os.path.join(directory, version, 'meta.json')) as f:
+        covered = json.load(f).get('covered')
+    return tuple(pd.Timestamp(ts) for ts in covered) if covered else None
+
+# Refresher: fetch a universe and publish it for the workers
+if __name__ == "__main__":
+    import argparse
+    from data.data_fetch import fetch_data_batch
+
+    parser = argparse.ArgumentParser(description="Fetch prices and publish them to the shared price store.")
+    parser.add_argument('symbols', nargs='+')
+    parser.add_argument('--start', default="2024-01-01")
+    parser.add_argument('--end', default="2024-11-08")
+    parser.add_argument('--directory', default=PRICE_STORE_DIR)
+    args = parser.parse_args()
+
+    prices, failures = fetch_data_batch(args.symbols, args.start, args.end)
+    for failure in failures:
+        print(f"Failed to fetch {failure['symbol']}: {failure['error']}")
+    version = write_price_store(prices, args.directory, covered=(args.start, args.end))
+    print(f"Published version {version} to {args.directory}")
@@ -0,0 +1,135 @@
+# data/providers.py
+
+import os
+import zlib
+import numpy as np
+import pandas as pd
+
+OHLCV_FIELDS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+def combine_frames(frames, symbols):
+    """
+    Combine per-ticker OHLCV frames into the (ticker, field) MultiIndex frame
+    returned by yf.download(..., group_by='ticker').
+    """
+    frames = {symbol: frames[symbol] for symbol in symbols if symbol in frames}
+    if not frames:
+        return pd.DataFrame(columns=pd.MultiIndex.from_tuples([], names=['Ticker', 'Price']))
+    data = pd.concat(frames, axis=1)
+    data.columns.names = ['Ticker', 'Price']
+    return data
+
+class MarketDataProvider:
+    """
+    Source of daily OHLCV bars. Subclasses implement download().
+    """
+    # Whether fetch_data should keep this provider's bars in the on-disk cache
+    use_cache = False
+
+    def download(self, symbols, start_date, end_date):
+        """
+        Return bars for symbols in [start_date, end_date) as a (ticker, field) frame.
+        """
+        raise NotImplementedError
+
+class YFinanceProvider(MarketDataProvider):
+    use_cache = True
+
+    def download(self, symbols, start_date, end_date):
+        # Imported here so offline providers work without yfinance installed
+        import yfinance as yf
+
+        data = yf.download(symbols, start=start_date, end=end_date, group_by='ticker')
+        # A single symbol may come back without the ticker column level
+        if not isinstance(data.columns, pd.MultiIndex):
+            data.columns = pd.MultiIndex.from_product([symbols, data.columns])
+        data.columns.names = ['Ticker', 'Price']
+        return data
+
+class FileProvider(MarketDataProvider):
+    """
+    Read bars from a directory with one <TICKER>.parquet or <TICKER>.csv file
+    per ticker. Files need a date column or index plus the OHLCV columns.
+    """
+    def __init__(self, directory):
+        self.directory = directory
+
+    def _read(self, symbol):
+        parquet_path = os.path.join(self.directory, f"{symbol}.parquet")
+        csv_path = os.path.join(self.directory, f"{symbol}.csv")
+        if os.path.exists(parquet_path):
+            frame = pd.read_parquet(parquet_path)
+        elif os.path.exists(csv_path):
+            frame = pd.read_csv(csv_path, index_col=0)
+        else:
+            return None
+        frame.index = pd.DatetimeIndex(pd.to_datetime(frame.index), name='Date')
+        return frame.sort_index()
+
+    def download(self, symbols, start_date, end_date):
+        start = pd.Timestamp(start_date)
+        end = pd.Timestamp(end_date)
+        frames = {}
+        for symbol in symbols:
+            frame = self._read(symbol)
+            if frame is not None:
+                frames[symbol] = frame[(frame.index >= start) & (frame.index < end)]
+        return combine_frames(frames, symbols)
+
+class SyntheticProvider(MarketDataProvider):
+    """
+    Deterministic geometric random walk per ticker on business days.
+    The same (seed, ticker, date) always produces the same bar, whatever
+    range is requested, so results are reproducible across calls.
+    """
+    EPOCH = pd.Timestamp('2000-01-03')
+
+    def __init__(self, seed=0, start_price=100.0, annual_drift=0.07, annual_volatility=0.2):
+        self.seed = seed
+        self.start_price = start_price
+        self.daily_drift = annual_drift / 252
+        self.daily_volatility = annual_volatility / np.sqrt(252)
+
+    def _walk(self, symbol, n_days):
+        # crc32 is stable across processes, unlike hash()
+        crc = zlib.crc32(symbol.encode())
+        rng = np.random.default_rng([self.seed, crc])
+        log_returns = rng.normal(self.daily_drift, self.daily_volatility, size=(n_days, 3))
+        close = self.start_price * np.exp(np.cumsum(log_returns[:, 0]))
+        # Sliced so a range ending on or before EPOCH gives an empty walk
+        open_ = np.concatenate([[self.start_price], close[:-1]])[:n_days]
+        spread = np.abs(log_returns[:, 1:]) * close[:, None]
+        high = np.maximum(open_, close) + spread[:, 0]
+        low = np.minimum(open_, close) - spread[:, 1]
+        # Separate stream, so a day's volume does not depend on the walk length
+        volume = np.random.default_rng([self.seed, crc, 1]).integers(1_000_000, 50_000_000, size=n_days)
+        return np.column_stack([open_, high, low, close, volume])
+
+    def download(self, symbols, start_date, end_date):
+        start = max(pd.Timestamp(start_date), self.EPOCH)
+        end = pd.Timestamp(end_date)
+        all_dates = pd.bdate_range(self.EPOCH, end - pd.Timedelta(days=1), name='Date')
+        keep = all_dates >= start
+
+        frames = {}
+        for symbol in symbols:
+            values = self._walk(symbol, len(all_dates))[keep]
+            frame = pd.DataFrame(values, index=all_dates[keep], columns=OHLCV_FIELDS)
+            frame['Volume'] = frame['Volume'].astype('int64')
+            frames[symbol] = frame
+        return combine_frames(frames, symbols)
+
+def provider_from_env():
+    """
+    Build the provider named by MARKET_DATA_PROVIDER:
+    'yfinance' (default), 'files:<directory>' or 'synthetic[:<seed>]'.
+    """
+    name = os.environ.get('MARKET_DATA_PROVIDER', 'yfinance')
+    kind, _, argument = name.partition(':')
+    if kind == 'yfinance':
+        return YFinanceProvider()
+    if kind == 'files':
+        return FileProvider(argument or 'data/prices')
+    if kind == 'synthetic':
+        return SyntheticProvider(seed=int(argument or 0))
+    raise ValueError(f"Unknown market data provider: {name}")
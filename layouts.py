@@ -2,7 +2,7 @@
 
 from dash import html, dcc, dash_table
 import dash_bootstrap_components as dbc
-from constants import income_columns, expenses_columns, income_data, expenses_data
+from constants import income_columns, expenses_columns, LEDGER_PAGE_SIZE
 from utils import month_options
 
 # Define the app layout
@@ -20,9 +20,17 @@ app_layout = dbc.Container([
             dash_table.DataTable(
                 id='income-table',
                 columns=income_columns,
-                data=income_data,
+                data=[],  # Pages are served from the ledger store
                 editable=True,
                 row_deletable=True,
+                page_action='custom',
+                page_current=0,
+                page_size=LEDGER_PAGE_SIZE,
+                sort_action='custom',
+                sort_mode='multi',
+                sort_by=[],
+                filter_action='custom',
+                filter_query='',
                 dropdown={
                     'Month': {
                         'options': month_options
@@ -33,6 +41,9 @@ app_layout = dbc.Container([
             width=12
         )
     ]),
+    dbc.Row([
+        dbc.Col(html.Div(id='income-table-errors', className='text-danger mb-2'), width=12)
+    ]),
     dbc.Row([
         dbc.Col(
             dbc.Button('Add Income Row', id='add-income-row', n_clicks=0, color='primary'),
@@ -49,9 +60,17 @@ app_layout = dbc.Container([
             dash_table.DataTable(
                 id='expenses-table',
                 columns=expenses_columns,
-                data=expenses_data,
+                data=[],  # Pages are served from the ledger store
                 editable=True,
                 row_deletable=True,
+                page_action='custom',
+                page_current=0,
+                page_size=LEDGER_PAGE_SIZE,
+                sort_action='custom',
+                sort_mode='multi',
+                sort_by=[],
+                filter_action='custom',
+                filter_query='',
                 dropdown={
                     'Month': {
                         'options': month_options
@@ -62,6 +81,9 @@ app_layout = dbc.Container([
             width=12
         )
     ]),
+    dbc.Row([
+        dbc.Col(html.Div(id='expenses-table-errors', className='text-danger mb-2'), width=12)
+    ]),
     dbc.Row([
         dbc.Col(
             dbc.Button('Add Expense Row', id='add-expenses-row', n_clicks=0, color='primary'),
@@ -106,6 +128,18 @@ app_layout = dbc.Container([
         ], width=6)
     ]),
     
+    # Ledger session (rows live server-side), edit deltas and change counters
+    dcc.Store(id='session-id', storage_type='session'),
+    dcc.Store(id='income-delta'),
+    dcc.Store(id='expenses-delta'),
+    dcc.Store(id='income-version', data=0),
+    dcc.Store(id='expenses-version', data=0),
+
+    # Aggregated ledgers, shared by the filter, chart and metrics callbacks, and
+    # the running Actual Amount totals behind the metrics
+    dcc.Store(id='ledger-summary'),
+    dcc.Store(id='ledger-totals'),
+
     # Financial Metrics
     dbc.Row([
         dbc.Col(html.H3('Financial Metrics'), width=12)
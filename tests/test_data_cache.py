@@ -0,0 +1,19 @@
+# tests/test_data_cache.py
+
+import pandas as pd
+from data import data_cache
+from data.data_fetch import fetch_data
+from data.providers import SyntheticProvider
+
+class CachedSyntheticProvider(SyntheticProvider):
+    use_cache = True
+
+def test_warm_fetch_matches_cold_fetch(tmp_path, monkeypatch):
+    monkeypatch.setattr(data_cache, 'CACHE_DIR', str(tmp_path))
+    provider = CachedSyntheticProvider()
+    cold = fetch_data(["SPY", "QQQ"], "2024-01-01", "2024-03-01", provider=provider)
+    warm = fetch_data(["SPY", "QQQ"], "2024-01-01", "2024-03-01", provider=provider)
+
+    pd.testing.assert_frame_equal(cold, warm)
+    assert warm.index.name == "Date"
+    assert warm[("SPY", "Volume")].dtype == cold[("SPY", "Volume")].dtype
@@ -0,0 +1,18 @@
+# tests/test_data_fetch.py
+
+from data.data_fetch import fetch_data_batch
+from data.providers import SyntheticProvider
+
+class FailingSymbolProvider(SyntheticProvider):
+    # Any request that includes BAD raises, like a provider rejecting the whole batch
+    def download(self, symbols, start_date, end_date):
+        if "BAD" in symbols:
+            raise ValueError("unknown symbol BAD")
+        return super().download(symbols, start_date, end_date)
+
+def test_failed_chunk_only_reports_failing_symbols():
+    data, failures = fetch_data_batch(["SPY", "BAD", "QQQ", "IWM"], "2024-01-01", "2024-03-01", chunk_size=3,
+                                      requests_per_second=1000, use_cache=False,
+                                      provider=FailingSymbolProvider())
+    assert [failure["symbol"] for failure in failures] == ["BAD"]
+    assert sorted(data.columns.get_level_values(0).unique()) == ["IWM", "QQQ", "SPY"]
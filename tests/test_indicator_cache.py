@@ -0,0 +1,15 @@
+# tests/test_indicator_cache.py
+
+import os
+from calculations.indicator_cache import IndicatorCache
+
+def test_unreadable_disk_entry_is_a_miss_and_removed(tmp_path):
+    cache = IndicatorCache(disk_dir=str(tmp_path))
+    path = cache._disk_path(("sma", 20))
+    with open(path, 'wb') as f:
+        # Pickle of a single value, not the (key, value) pair the cache writes
+        f.write(b"\x80\x04K\x01.")
+    assert cache.get_or_compute(("sma", 20), lambda: 42) == 42
+    assert cache.misses == 1
+    assert os.path.exists(path)
+    assert IndicatorCache(disk_dir=str(tmp_path)).get_or_compute(("sma", 20), lambda: 0) == 42
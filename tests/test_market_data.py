@@ -0,0 +1,32 @@
+# tests/test_market_data.py
+
+import pytest
+from data.market_data import MarketDataContext
+from data.price_store import write_price_store
+from data.providers import SyntheticProvider
+
+def _publish(directory, seed):
+    data = SyntheticProvider(seed=seed).download(["SPY", "QQQ"], "2024-01-01", "2024-11-08")
+    write_price_store(data, str(directory), covered=("2024-01-01", "2024-11-08"))
+    return data
+
+def _last_close(data):
+    return float(data[("SPY", "Close")].iloc[-1])
+
+def test_derived_follows_new_store_version(tmp_path):
+    first = _publish(tmp_path, seed=1)
+    context = MarketDataContext(store_dir=str(tmp_path))
+    assert context.derived("last", _last_close) == pytest.approx(_last_close(first))
+
+    second = _publish(tmp_path, seed=2)
+    assert _last_close(first) != _last_close(second)
+    assert context.derived("last", _last_close) == pytest.approx(_last_close(second))
+
+def test_context_evicts_least_recently_used(tmp_path):
+    _publish(tmp_path, seed=1)
+    context = MarketDataContext(store_dir=str(tmp_path), max_entries=2)
+    for end in ("2024-03-01", "2024-04-01", "2024-05-01"):
+        context.derived("last", _last_close, end_date=end)
+    assert len(context._frames) == 2
+    assert len(context._derived) == 2
+    assert ("last", ("SPY", "QQQ"), "2024-01-01", "2024-03-01") not in context._derived
@@ -0,0 +1,9 @@
+# tests/test_providers.py
+
+from data.providers import SyntheticProvider
+
+def test_synthetic_range_before_epoch_is_empty():
+    data = SyntheticProvider().download(["SPY", "QQQ"], "1999-01-01", "2000-01-03")
+    assert data.empty
+    assert data.columns.names == ["Ticker", "Price"]
+    assert list(data.columns.get_level_values(0).unique()) == ["SPY", "QQQ"]
@@ -0,0 +1,16 @@
+# tests/test_savings_calculations.py
+
+import numpy as np
+from calculations.savings_calculations import calculate_required_contribution_monte_carlo
+
+def test_batched_quantiles_match_each_client_alone():
+    rng = np.random.default_rng(3)
+    n = 50
+    args = dict(current_balance=rng.uniform(0, 5e4, n), goal_amount=rng.uniform(1e4, 2e5, n),
+                contribution_frequency='monthly', timeframe_months=rng.integers(0, 36, n),
+                success_probability=rng.uniform(0, 1, n), n_paths=500)
+    batched = calculate_required_contribution_monte_carlo(**args)
+    alone = [calculate_required_contribution_monte_carlo(
+        args['current_balance'][i], args['goal_amount'][i], 'monthly', args['timeframe_months'][i],
+        args['success_probability'][i], n_paths=500) for i in range(n)]
+    np.testing.assert_array_equal(batched, alone)
@@ -1,7 +1,64 @@
 # utils.py
 
 import calendar
+import datetime
+import os
+import re
+
+# Ledger rows are dated by month as integer period codes, year * 12 + (month - 1),
+# so periods sort and compare as plain integers across years. Tables show and
+# store them as 'YYYY-MM'.
+LEDGER_LAST_YEAR = int(os.environ.get('LEDGER_LAST_YEAR', datetime.date.today().year + 1))
+LEDGER_FIRST_YEAR = int(os.environ.get('LEDGER_FIRST_YEAR', LEDGER_LAST_YEAR - 11))
 
-# Define month options using the calendar module
-month_options = [{'label': month, 'value': month} for month in calendar.month_name if month]
 month_order = list(calendar.month_name)[1:]  # Skip empty string at index 0
+_month_numbers = {name.lower(): number for number, name in enumerate(month_order, start=1)}
+_month_numbers.update({name.lower(): number for number, name in enumerate(list(calendar.month_abbr)[1:], start=1)})
+
+def period_code(value, default_year=None):
+    """
+    Period code of a ledger Month value: 'YYYY-MM', 'YYYY-MM-DD', 'January 2024',
+    a date, or (for rows from before multi-year ledgers) a bare month name,
+    which falls in default_year. Returns None for blank or unrecognised values,
+    and for bare month names when no default_year is given.
+    """
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.year * 12 + value.month - 1
+    if not isinstance(value, str):
+        return None
+    text = value.strip()
+    match = re.match(r'^(\d{4})-(\d{1,2})(?:-\d{1,2})?$', text)
+    if match:
+        year, month = int(match.group(1)), int(match.group(2))
+    else:
+        parts = text.split()
+        month = _month_numbers.get(parts[0].lower()) if parts else None
+        if month is None or len(parts) > 2 or (len(parts) == 2 and not parts[1].isdigit()):
+            return None
+        year = int(parts[1]) if len(parts) == 2 else default_year
+        if year is None:
+            return None
+    if not 1 <= month <= 12:
+        return None
+    return year * 12 + month - 1
+
+def period_value(code):
+    # 'YYYY-MM', as stored in the tables
+    return f"{code // 12:04d}-{code % 12 + 1:02d}"
+
+def period_label(code):
+    # 'January 2024', for charts and dropdowns
+    return f"{month_order[code % 12]} {code // 12}"
+
+def normalize_month(value, default_year):
+    # Stored form ('YYYY-MM') of a Month value, applied once as rows are loaded
+    # so bare month names keep the year they were loaded in; unrecognised
+    # values are left as they are
+    code = period_code(value, default_year)
+    return value if code is None else period_value(code)
+
+# Define month options for the ledger years, newest first
+month_options = [
+    {'label': period_label(code), 'value': period_value(code)}
+    for code in range(LEDGER_LAST_YEAR * 12 + 11, LEDGER_FIRST_YEAR * 12 - 1, -1)
+]
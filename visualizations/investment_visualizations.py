@@ -1,51 +1,85 @@
 import pandas as pd
 import plotly.graph_objects as go
-from data.data_fetch import fetch_data
-from calculations.financial_calculations import (
-    calculate_rsi,
-    calculate_macd,
-    calculate_beta,
-    calculate_volatility
-)
+from data.compact_prices import CompactPrices
+from data.market_data import default_context
+from calculations.financial_calculations import calculate_beta
+from calculations.indicator_engine import compute_indicators
+from calculations.resampling_pyramid import ResamplingPyramid
+from calculations.rolling_statistics import rolling_beta
 
-# Fetch data for visualization
-spy_data = fetch_data(symbols=["SPY", "QQQ"], start_date="2024-01-01", end_date="2024-11-08")
+# Add RSI, MACD, Signal and Volatility columns to a copy of the price data
+def add_indicators(data):
+    tickers = list(data.columns.get_level_values(0).unique())
+    close = data.xs("Close", axis=1, level=1)[tickers]
 
-# Calculate the daily returns for SPY and QQQ
-spy_returns = spy_data[("SPY", "Close")].pct_change()
-qqq_returns = spy_data[("QQQ", "Close")].pct_change()
+    # All tickers and indicators in one vectorized pass
+    block = compute_indicators(close.to_numpy())
+    if isinstance(data, CompactPrices):
+        return data.with_fields(block)
 
-# Calculate the Beta value
-beta_value = calculate_beta(spy_returns, qqq_returns)
+    indicators = pd.concat(
+        {name: pd.DataFrame(values, index=data.index, columns=tickers) for name, values in block.items()},
+        axis=1
+    ).swaplevel(axis=1)
 
-# Calculate RSI for SPY and QQQ and add them to the data
-spy_data[("SPY", "RSI")] = calculate_rsi(spy_data[("SPY", "Close")])
-spy_data[("QQQ", "RSI")] = calculate_rsi(spy_data[("QQQ", "Close")])
+    data = pd.concat([data, indicators], axis=1)
+    return data[tickers]
 
-# Calculate MACD for SPY and QQQ and add to the data
-spy_data[("SPY", "MACD")], spy_data[("SPY", "Signal")] = calculate_macd(spy_data[("SPY", "Close")]).values.T
-spy_data[("QQQ", "MACD")], spy_data[("QQQ", "Signal")] = calculate_macd(spy_data[("QQQ", "Close")]).values.T
+# Price data with indicators, computed once per context
+def get_indicator_data(context=None):
+    context = context or default_context
+    return context.derived("indicators", add_indicators)
 
-# Calculate Volatility for SPY and QQQ and add them to the data
-spy_data[("SPY", "Volatility")] = calculate_volatility(spy_data[("SPY", "Close")])
-spy_data[("QQQ", "Volatility")] = calculate_volatility(spy_data[("QQQ", "Close")])
+# Beta of SPY relative to QQQ from daily returns
+def get_beta(context=None):
+    context = context or default_context
+    def compute(data):
+        spy_returns = data[("SPY", "Close")].pct_change()
+        qqq_returns = data[("QQQ", "Close")].pct_change()
+        return calculate_beta(spy_returns, qqq_returns)
+    return context.derived("beta", compute)
+
+# Daily to quarterly bars, built once per context
+def get_pyramid(context=None):
+    context = context or default_context
+    def compute(data):
+        return ResamplingPyramid(data.to_frame() if isinstance(data, CompactPrices) else data)
+    return context.derived("pyramid", compute)
+
+# Beta of SPY relative to QQQ from monthly summed percentage changes
+def get_beta_monthly(context=None):
+    return get_pyramid(context).beta("SPY", "QQQ", "M")
+
+# Rows to plot: one per period of the finest pyramid level that fits the chart
+def _chart_rows(dates, context=None):
+    if not len(dates):
+        return slice(None)
+    level = get_pyramid(context).level_for(dates[0], dates[-1])
+    return slice(None) if level == "D" else ResamplingPyramid.last_rows(dates, level)
+
+# Rolling beta and correlation against a benchmark, computed once per context
+def get_rolling_statistics(context=None, benchmark="QQQ", window=63):
+    context = context or default_context
+    return context.derived(("rolling", benchmark, window), lambda data: rolling_beta(data, benchmark, window))
 
 # Create RSI Chart
-def create_rsi_chart(data):
+def create_rsi_chart(context=None):
+    data = get_indicator_data(context)
+    rows = _chart_rows(data.index, context)
     fig = go.Figure()
     
     # Add RSI for SPY
     fig.add_trace(go.Scatter(
-        x=data.index,
-        y=data["SPY", "RSI"],
+        x=data.index[rows],
+        y=data["SPY", "RSI"].iloc[rows],
         mode='lines',
         name='SPY RSI'
     ))
     
     # Add RSI for QQQ
     fig.add_trace(go.Scatter(
-        x=data.index,
-        y=data["QQQ", "RSI"],
+        x=data.index[rows],
+        y=data["QQQ", "RSI"].iloc[rows],
         mode='lines',
         name='QQQ RSI'
     ))
@@ -61,33 +95,35 @@ def create_rsi_chart(data):
     return fig
 
 # Create MACD Chart
-def create_macd_chart(data):
+def create_macd_chart(context=None):
+    data = get_indicator_data(context)
+    rows = _chart_rows(data.index, context)
     fig = go.Figure()
     
     # Add MACD and Signal for SPY
     fig.add_trace(go.Scatter(
-        x=data.index,
-        y=data["SPY", "MACD"],
+        x=data.index[rows],
+        y=data["SPY", "MACD"].iloc[rows],
         mode='lines',
         name='SPY MACD'
     ))
     fig.add_trace(go.Scatter(
-        x=data.index,
-        y=data["SPY", "Signal"],
+        x=data.index[rows],
+        y=data["SPY", "Signal"].iloc[rows],
         mode='lines',
         name='SPY Signal'
     ))
     
     # Add MACD and Signal for QQQ
     fig.add_trace(go.Scatter(
-        x=data.index,
-        y=data["QQQ", "MACD"],
+        x=data.index[rows],
+        y=data["QQQ", "MACD"].iloc[rows],
         mode='lines',
         name='QQQ MACD'
     ))
     fig.add_trace(go.Scatter(
-        x=data.index,
-        y=data["QQQ", "Signal"],
+        x=data.index[rows],
+        y=data["QQQ", "Signal"].iloc[rows],
         mode='lines',
         name='QQQ Signal'
     ))
@@ -103,21 +139,23 @@ def create_macd_chart(data):
     return fig
 
 # Create Volatility Chart
-def create_volatility_chart(data):
+def create_volatility_chart(context=None):
+    data = get_indicator_data(context)
+    rows = _chart_rows(data.index, context)
     fig = go.Figure()
     
     # Add Volatility for SPY
     fig.add_trace(go.Scatter(
-        x=data.index,
-        y=data["SPY", "Volatility"],
+        x=data.index[rows],
+        y=data["SPY", "Volatility"].iloc[rows],
         mode='lines',
         name='SPY Volatility'
     ))
     
     # Add Volatility for QQQ
     fig.add_trace(go.Scatter(
-        x=data.index,
-        y=data["QQQ", "Volatility"],
+        x=data.index[rows],
+        y=data["QQQ", "Volatility"].iloc[rows],
         mode='lines',
         name='QQQ Volatility'
     ))
@@ -132,23 +170,58 @@ def create_volatility_chart(data):
     
     return fig
 
+# Create Rolling Correlation Chart
+def create_rolling_correlation_chart(context=None, window=63):
+    rolling_beta_data, rolling_correlation = get_rolling_statistics(context, "QQQ", window)
+    rows = _chart_rows(rolling_correlation.index, context)
+    fig = go.Figure()
+
+    # Add rolling correlation and beta of SPY against QQQ
+    fig.add_trace(go.Scatter(
+        x=rolling_correlation.index[rows],
+        y=rolling_correlation["SPY"].iloc[rows],
+        mode='lines',
+        name='SPY/QQQ Correlation'
+    ))
+    fig.add_trace(go.Scatter(
+        x=rolling_beta_data.index[rows],
+        y=rolling_beta_data["SPY"].iloc[rows],
+        mode='lines',
+        name='SPY/QQQ Beta'
+    ))
+
+    # Update layout
+    fig.update_layout(
+        title=f'{window}-Day Rolling Correlation and Beta of SPY relative to QQQ',
+        xaxis_title='Date',
+        yaxis_title='Value',
+        template='plotly_dark'
+    )
+
+    return fig
+
 # Display Beta Value
-def display_beta():
-    return f"The Beta of SPY relative to QQQ for the selected period is: {beta_value:.2f}"
+def display_beta(context=None):
+    return (f"The Beta of SPY relative to QQQ for the selected period is: {get_beta(context):.2f}"
+            f" (monthly: {get_beta_monthly(context):.2f})")
 
 # Generate Visualizations
 if __name__ == "__main__":
     # RSI Chart
-    rsi_chart = create_rsi_chart(spy_data)
+    rsi_chart = create_rsi_chart()
     rsi_chart.show()
     
     # MACD Chart
-    macd_chart = create_macd_chart(spy_data)
+    macd_chart = create_macd_chart()
     macd_chart.show()
     
     # Volatility Chart
-    volatility_chart = create_volatility_chart(spy_data)
+    volatility_chart = create_volatility_chart()
     volatility_chart.show()
+
+    # Rolling Correlation Chart
+    rolling_correlation_chart = create_rolling_correlation_chart()
+    rolling_correlation_chart.show()
     
     # Display Beta Value
     print(display_beta())